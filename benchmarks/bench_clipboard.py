@@ -0,0 +1,80 @@
+"""Benchmark read and write latency of each clipboard backend.
+
+Each backend is opened once and then read and written repeatedly in
+process, as the daemon does. Without --real, pyperclip is pointed at
+stand-in wl-paste/wl-copy commands on PATH (its Wayland backend), so it
+pays a helper process per call as on a real Linux desktop; backends that
+cannot be opened here (e.g. tk without an X display) are reported as
+unavailable.
+
+Usage:
+    python -m benchmarks.bench_clipboard [--repeat N] [--real]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_daemon import install_fake_clipboard
+from src.clipboard_backends import BACKENDS
+
+CONTENT = "build log\nsee https://example.com/issue/1\n" * 20
+
+
+def measure_backend(name: str, repeat: int) -> tuple:
+    """Open a backend and time its reads and writes.
+
+    Args:
+        name: Backend name
+        repeat: Number of reads and of writes
+
+    Returns:
+        Tuple of (open seconds, median read seconds, median write seconds)
+
+    Raises:
+        Exception: If the backend cannot be opened
+    """
+    start = time.perf_counter()
+    backend = BACKENDS[name]()
+    # The first read includes lazy setup, e.g. importing pyperclip
+    backend.paste()
+    opened = time.perf_counter() - start
+
+    reads = []
+    writes = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        backend.paste()
+        reads.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        backend.copy(CONTENT)
+        writes.append(time.perf_counter() - start)
+    return opened, statistics.median(reads), statistics.median(writes)
+
+
+def main() -> None:
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description="Benchmark clipboard backend latency")
+    parser.add_argument("--repeat", type=int, default=20, help="Reads and writes per backend")
+    parser.add_argument("--real", action="store_true", help="Use the real clipboard instead of stand-in commands")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if not args.real:
+            os.environ.update(install_fake_clipboard(Path(temp_dir), CONTENT))
+
+        print(f"{'backend':<10} {'open+first':>11} {'read':>9} {'write':>9}")
+        for name in BACKENDS:
+            try:
+                opened, read, write = measure_backend(name, args.repeat)
+            except Exception as e:
+                print(f"{name:<10} unavailable: {e}")
+                continue
+            print(f"{name:<10} {opened * 1000:8.2f} ms {read * 1000:6.2f} ms {write * 1000:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
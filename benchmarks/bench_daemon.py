@@ -0,0 +1,204 @@
+"""Benchmark hotkey-to-menu latency, in-process launcher versus daemon client.
+
+Each launch is a fresh process, as when started by the hotkey, and is
+timed from spawn until the selection prompt is printed. The clipboard is
+served by a stand-in wl-paste on PATH (pyperclip's Wayland backend), so
+the clipboard read costs a subprocess as it does on a real Linux desktop.
+Interpreter startup alone (python -c pass) is the floor for both. The
+daemon is measured without and with --watch; with --watch the menu is
+prepared before the first launch, so only the handoff is timed.
+
+Usage:
+    python -m benchmarks.bench_daemon [--patterns N] [--repeat N]
+"""
+
+import argparse
+import os
+import random
+import string
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from src.client import get_socket_path, request_menu
+
+PROMPT = "選択してください".encode("utf-8")
+
+
+def write_config(root: Path, pattern_count: int) -> Path:
+    """Write a config with generated patterns, one of which matches.
+
+    Args:
+        root: Directory to write into
+        pattern_count: Number of patterns
+
+    Returns:
+        Path to the config file
+    """
+    rng = random.Random(0)
+    templates = [r"{w}\\d+", r"^https?://{w}", r"\\b{w}\\b", r"{w}[-_](?:foo|bar)+", r"(?i){w}: .*"]
+    entries = [f'clipboard_temp_file = "{(root / "clipboard.txt").as_posix()}"\n']
+    entries.append('[[patterns]]\nname = "URL"\nregex = "https?://\\\\S+"\ncommand = "echo {CLIPBOARD_FILE}"\n')
+    for _ in range(pattern_count - 1):
+        word = "".join(rng.choice(string.ascii_lowercase) for _ in range(8))
+        regex = rng.choice(templates).format(w=word)
+        entries.append(f'[[patterns]]\nname = "{word}"\nregex = "{regex}"\ncommand = "echo {{CLIPBOARD_FILE}}"\n')
+    config_path = root / "config.toml"
+    config_path.write_text("\n".join(entries), encoding="utf-8")
+    return config_path
+
+
+def install_fake_clipboard(root: Path, content: str) -> dict:
+    """Install stand-in wl-paste/wl-copy commands serving fixed content.
+
+    Args:
+        root: Directory to write into
+        content: Clipboard content to serve
+
+    Returns:
+        Environment for the launched processes
+    """
+    bin_dir = root / "bin"
+    bin_dir.mkdir()
+    clipboard_file = root / "clipboard_source.txt"
+    clipboard_file.write_text(content, encoding="utf-8")
+    (bin_dir / "wl-paste").write_text(f'#!/bin/sh\ncat "{clipboard_file}"\n')
+    (bin_dir / "wl-copy").write_text("#!/bin/sh\ncat > /dev/null\n")
+    for name in ("wl-paste", "wl-copy"):
+        (bin_dir / name).chmod(0o755)
+
+    env = dict(os.environ)
+    env["PATH"] = f"{bin_dir}{os.pathsep}{env.get('PATH', '')}"
+    env["WAYLAND_DISPLAY"] = "bench"
+    return env
+
+
+def time_to_prompt(args: list, env: dict, marker: bytes | None = PROMPT) -> float:
+    """Time a process from spawn until it prints a marker (or exits).
+
+    Args:
+        args: Command line
+        env: Environment
+        marker: Output that ends the measurement, None to wait for exit
+
+    Returns:
+        Elapsed seconds
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=env)
+    output = b""
+    while marker is None or marker not in output:
+        chunk = os.read(process.stdout.fileno(), 65536)
+        if not chunk:
+            break
+        output += chunk
+    elapsed = time.perf_counter() - start
+    process.kill()
+    process.wait()
+    process.stdout.close()
+    if marker is not None and marker not in output:
+        raise RuntimeError(f"no menu from {args}: {output.decode('utf-8', errors='replace')}")
+    return elapsed
+
+
+def best_time(args: list, env: dict, repeat: int, marker: bytes | None = PROMPT) -> float:
+    """Get the best time to prompt of several launches.
+
+    Args:
+        args: Command line
+        env: Environment
+        repeat: Number of launches
+        marker: Output that ends the measurement, None to wait for exit
+
+    Returns:
+        Best time in seconds
+    """
+    return min(time_to_prompt(args, env, marker) for _ in range(repeat))
+
+
+def wait_for_daemon(socket_path: str, daemon: subprocess.Popen, timeout: float = 30) -> None:
+    """Wait until the daemon answers requests.
+
+    Args:
+        socket_path: Endpoint path of the daemon
+        daemon: Daemon process
+        timeout: Seconds to wait
+
+    Raises:
+        RuntimeError: If the daemon does not come up
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if daemon.poll() is not None:
+            raise RuntimeError("daemon exited")
+        if os.path.exists(socket_path) and request_menu(socket_path) is not None:
+            return
+        time.sleep(0.05)
+    raise RuntimeError("daemon did not start")
+
+
+def time_client(config_arg: list, env: dict, repeat: int, watch: bool) -> float:
+    """Start a daemon and get the best client time to prompt.
+
+    Args:
+        config_arg: Config file arguments
+        env: Environment
+        repeat: Number of launches
+        watch: Whether the daemon watches the clipboard
+
+    Returns:
+        Best time in seconds
+    """
+    daemon = subprocess.Popen(
+        [sys.executable, "-m", "src.launcher", *config_arg, "--daemon", *(["--watch"] if watch else [])],
+        stdout=subprocess.DEVNULL,
+        env=env,
+    )
+    try:
+        socket_path = get_socket_path(config_arg[1])
+        if watch:
+            # Let the watcher settle on the clipboard before the first launch
+            while not os.path.exists(socket_path):
+                time.sleep(0.05)
+            time.sleep(1)
+        wait_for_daemon(socket_path, daemon)
+        return best_time([sys.executable, "-m", "src.client", *config_arg], env, repeat)
+    finally:
+        daemon.terminate()
+        daemon.wait()
+
+
+def main() -> None:
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description="Benchmark hotkey-to-menu latency with and without the daemon")
+    parser.add_argument("--patterns", type=int, default=1000, help="Number of generated patterns")
+    parser.add_argument("--repeat", type=int, default=10, help="Launches per measurement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        config_path = write_config(root, args.patterns)
+        env = install_fake_clipboard(root, "build log\nsee https://example.com/issue/1\n" * 20)
+        config_arg = ["--config-filename", str(config_path)]
+
+        floor = best_time([sys.executable, "-c", "pass"], env, args.repeat, marker=None)
+        # The first launch writes the config snapshot, so in-process launches are warm
+        time_to_prompt([sys.executable, "-m", "src.launcher", *config_arg], env)
+        in_process = best_time([sys.executable, "-m", "src.launcher", *config_arg], env, args.repeat)
+
+        client = time_client(config_arg, env, args.repeat, watch=False)
+        watched = time_client(config_arg, env, args.repeat, watch=True)
+
+    print(f"patterns: {args.patterns}")
+    print(f"interpreter startup (floor): {floor * 1000:7.1f} ms")
+    print(f"in-process launcher:         {in_process * 1000:7.1f} ms")
+    print(f"daemon client:               {client * 1000:7.1f} ms")
+    print(f"client over floor:           {(client - floor) * 1000:7.1f} ms")
+    print(f"daemon client, --watch:      {watched * 1000:7.1f} ms")
+    print(f"--watch client over floor:   {(watched - floor) * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
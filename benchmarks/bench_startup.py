@@ -0,0 +1,142 @@
+"""Benchmark startup with a large pattern library, monolithic versus sharded.
+
+The same generated patterns are written once as a single config and once
+as gated shards included from a small config. For a clipboard that passes
+only a few gates, the sharded library loads and compiles only those shards.
+
+Usage:
+    python -m benchmarks.bench_startup [--shards N] [--patterns-per-shard N] [--repeat N]
+"""
+
+import argparse
+import random
+import re
+import string
+import tempfile
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+from src.config_snapshot import get_snapshot_path, load_config_and_patterns
+from src.includes import get_shard_paths, load_included_patterns
+from src.pattern_matcher import match_patterns
+
+
+def generate_patterns(rng: random.Random, count: int) -> str:
+    """Generate [[patterns]] entries.
+
+    Args:
+        rng: Random generator
+        count: Number of patterns
+
+    Returns:
+        TOML text of the patterns
+    """
+    templates = [r"{w}\\d+", r"^https?://{w}", r"\\b{w}\\b", r"{w}[-_](?:foo|bar)+", r"(?i){w}: .*"]
+    entries = []
+    for _ in range(count):
+        word = "".join(rng.choice(string.ascii_lowercase) for _ in range(8))
+        regex = rng.choice(templates).format(w=word)
+        entries.append(
+            f'[[patterns]]\nname = "{word}"\nregex = "{regex}"\ncommand = "notepad.exe {{CLIPBOARD_FILE}}"\n'
+        )
+    return "\n".join(entries)
+
+
+def write_libraries(root: Path, shard_count: int, patterns_per_shard: int) -> tuple[Path, Path]:
+    """Write the monolithic and the sharded library.
+
+    Args:
+        root: Directory to write into
+        shard_count: Number of shards
+        patterns_per_shard: Number of patterns in each shard
+
+    Returns:
+        Tuple of (monolithic config path, sharded config path)
+    """
+    rng = random.Random(0)
+    shard_dir = root / "patterns"
+    shard_dir.mkdir()
+    shards = []
+    for shard in range(shard_count):
+        patterns = generate_patterns(rng, patterns_per_shard)
+        shards.append(patterns)
+        gate = f'[gate]\nrequired_literals = ["domain{shard:03d}"]\n\n'
+        (shard_dir / f"shard{shard:03d}.toml").write_text(gate + patterns, encoding="utf-8")
+
+    monolithic_path = root / "monolithic.toml"
+    monolithic_path.write_text("\n".join(shards), encoding="utf-8")
+    sharded_path = root / "sharded.toml"
+    sharded_path.write_text('include = ["patterns/*.toml"]\n', encoding="utf-8")
+    return monolithic_path, sharded_path
+
+
+def startup(config_path: Path, content: str) -> int:
+    """Load a library and match the clipboard, as a launch does.
+
+    Args:
+        config_path: Path to config file
+        content: Clipboard text content
+
+    Returns:
+        Number of patterns that were loaded
+    """
+    config, patterns = load_config_and_patterns(config_path)
+    patterns = patterns + load_included_patterns(config, config_path, content)
+    match_patterns(content, patterns)
+    return len(patterns)
+
+
+def best_time(config_path: Path, content: str, repeat: int, cold: bool) -> tuple[float, int]:
+    """Get the best startup time of several runs.
+
+    Args:
+        config_path: Path to config file
+        content: Clipboard text content
+        repeat: Number of runs
+        cold: Whether to remove all snapshots before each run
+
+    Returns:
+        Tuple of (best time in seconds, number of patterns loaded)
+    """
+    config, _patterns = load_config_and_patterns(config_path)
+    files = [config_path] + get_shard_paths(config, config_path)
+    times = []
+    loaded = 0
+    for _ in range(repeat):
+        if cold:
+            for path in files:
+                get_snapshot_path(path).unlink(missing_ok=True)
+        # Each launch is a fresh process, so do not let re's cache help
+        re.purge()
+        start = time.perf_counter()
+        with redirect_stdout(StringIO()):
+            loaded = startup(config_path, content)
+        times.append(time.perf_counter() - start)
+    return min(times), loaded
+
+
+def main() -> None:
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description="Benchmark startup with a monolithic versus sharded library")
+    parser.add_argument("--shards", type=int, default=40, help="Number of shards")
+    parser.add_argument("--patterns-per-shard", type=int, default=250, help="Patterns in each shard")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement")
+    args = parser.parse_args()
+
+    # A clipboard that passes the gates of two shards
+    content = "build log for domain001 and domain007\n" * 200
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        monolithic_path, sharded_path = write_libraries(Path(temp_dir), args.shards, args.patterns_per_shard)
+        print(f"library: {args.shards * args.patterns_per_shard} patterns in {args.shards} shards")
+        for label, config_path in (("monolithic", monolithic_path), ("sharded", sharded_path)):
+            for cold in (True, False):
+                elapsed, loaded = best_time(config_path, content, args.repeat, cold)
+                state = "cold" if cold else "warm"
+                print(f"{label:10} {state}: {elapsed * 1000:8.1f} ms ({loaded} patterns loaded)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""Thin client of the launcher daemon.
+
+Bound to the hotkey in place of the launcher when the daemon is used. It
+asks the running daemon for the menu and shows it, so a launch costs
+little more than interpreter startup. Without a reachable daemon it falls
+back to the in-process launcher, so binding the hotkey to the client is
+always safe.
+
+Only cheap modules are imported before the menu is shown: no TOML,
+regex, pathlib or clipboard modules, and arguments are parsed by hand
+rather than with argparse. Messages are exchanged with marshal, which is
+built in and, unlike json, does not import re. marshal is not safe
+against malicious data, so a request starts with the access token as a
+fixed-length prefix, which the daemon checks before unmarshalling the
+rest.
+
+Usage:
+    python -m src.client --config-filename config.toml
+"""
+
+import marshal
+import os
+import socket
+import sys
+
+from .menu import run_menu
+
+# Bumped whenever requests or responses change shape
+PROTOCOL_VERSION = 5
+
+# Length of the access token prefix of a request (hex characters)
+TOKEN_LENGTH = 32
+
+# Seconds to wait for the daemon to accept, and to build the menu
+CONNECT_TIMEOUT = 0.5
+RESPONSE_TIMEOUT = 60
+
+# Bytes read from the socket at a time
+RECV_SIZE = 1 << 16
+
+
+def get_socket_path(config_filename: str) -> str:
+    """Get the daemon endpoint path of a config file.
+
+    Where Unix sockets are available this is the socket itself; elsewhere
+    it is a file holding the loopback port and access token of the daemon.
+
+    Args:
+        config_filename: Path to config file
+
+    Returns:
+        Absolute endpoint path next to the config file
+    """
+    return os.path.abspath(config_filename) + ".sock"
+
+
+def connect(socket_path: str) -> tuple[socket.socket, str]:
+    """Connect to the daemon of an endpoint.
+
+    Args:
+        socket_path: Endpoint path from get_socket_path
+
+    Returns:
+        Tuple of (connected socket, access token to send with requests)
+
+    Raises:
+        OSError: If no daemon is listening
+        ValueError: If the endpoint file is malformed
+    """
+    if hasattr(socket, "AF_UNIX"):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect(socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock, ""
+
+    with open(socket_path, "r", encoding="utf-8") as f:
+        port, token = f.read().split()
+    return socket.create_connection(("127.0.0.1", int(port)), CONNECT_TIMEOUT), token
+
+
+def encode_token(token: str) -> bytes:
+    """Encode an access token as the prefix of a request.
+
+    Args:
+        token: Access token from connect, empty for a Unix socket
+
+    Returns:
+        Token padded to TOKEN_LENGTH bytes
+
+    Raises:
+        ValueError: If the token is not ASCII
+    """
+    return token.encode("ascii").ljust(TOKEN_LENGTH, b"\0")
+
+
+def send_request(socket_path: str, fields: dict) -> dict | None:
+    """Send a request to the daemon and read its response.
+
+    Args:
+        socket_path: Endpoint path from get_socket_path
+        fields: Request fields besides the protocol version
+
+    Returns:
+        Response dictionary, or None if no compatible daemon answered
+    """
+    try:
+        sock, token = connect(socket_path)
+        with sock:
+            sock.settimeout(RESPONSE_TIMEOUT)
+            sock.sendall(encode_token(token) + marshal.dumps({"version": PROTOCOL_VERSION, **fields}))
+            sock.shutdown(socket.SHUT_WR)
+            chunks = []
+            while chunk := sock.recv(RECV_SIZE):
+                chunks.append(chunk)
+        response = marshal.loads(b"".join(chunks))
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(response, dict) or response.get("version") != PROTOCOL_VERSION:
+        return None
+    return response
+
+
+def request_menu(socket_path: str) -> dict | None:
+    """Ask the daemon for the menu of the current clipboard.
+
+    Args:
+        socket_path: Endpoint path from get_socket_path
+
+    Returns:
+        Response dictionary with "output" (text the daemon printed while
+        preparing), "menu" (menu dictionary, or None if the launch ended
+        early), "content_digest" (to have the content saved with) and
+        "exit_code", or None if no compatible daemon answered
+    """
+    return send_request(socket_path, {})
+
+
+def save_temp_file(socket_path: str, response: dict) -> str:
+    """Have the clipboard temp file of a menu written, before its command runs.
+
+    The daemon writes the content it served the menu for. If it cannot
+    (it was stopped, or served other content since), the clipboard is
+    read and saved here.
+
+    Args:
+        socket_path: Endpoint path from get_socket_path
+        response: Menu response from request_menu
+
+    Returns:
+        Path of the saved file
+
+    Raises:
+        SystemExit: If the file cannot be written
+    """
+    saved = send_request(socket_path, {"save": response["content_digest"]})
+    if saved is not None and saved["saved"]:
+        print(saved["output"], end="")
+        if saved["exit_code"] is not None:
+            sys.exit(saved["exit_code"])
+        return saved["temp_file"]
+
+    from .clipboard import get_clipboard_content, save_clipboard_file
+
+    return str(save_clipboard_file(get_clipboard_content(), response["menu"]))
+
+
+def get_content(socket_path: str, response: dict) -> str:
+    """Get the clipboard content of a menu, for a command's standard input.
+
+    The content comes from the daemon, without another clipboard read. If
+    the daemon cannot hand it over (it was stopped, or served other
+    content since), the clipboard is read here.
+
+    Args:
+        socket_path: Endpoint path from get_socket_path
+        response: Menu response from request_menu
+
+    Returns:
+        Clipboard text content
+
+    Raises:
+        SystemExit: If the clipboard has to be read here and is empty
+    """
+    handed = send_request(socket_path, {"content": response["content_digest"]})
+    if handed is not None and handed["content"] is not None:
+        return handed["content"]
+
+    from .clipboard import get_clipboard_content
+
+    return get_clipboard_content()
+
+
+def main(config_filename: str) -> None:
+    """Show the menu from the daemon, or launch in process without one.
+
+    Args:
+        config_filename: Path to config file
+    """
+    socket_path = get_socket_path(config_filename)
+    response = request_menu(socket_path)
+    if response is None:
+        from pathlib import Path
+
+        from .launcher import main as launch_in_process
+
+        launch_in_process(Path(config_filename))
+        return
+
+    print(response["output"], end="")
+    if response["menu"] is None:
+        sys.exit(response["exit_code"])
+    run_menu(
+        response["menu"],
+        save_temp_file=lambda: save_temp_file(socket_path, response),
+        get_content=lambda: get_content(socket_path, response),
+    )
+
+
+def parse_config_filename(argv: list) -> str:
+    """Get the --config-filename argument.
+
+    Args:
+        argv: Command-line arguments, without the program name
+
+    Returns:
+        Config file path
+
+    Raises:
+        SystemExit: If the argument is missing
+    """
+    for i, arg in enumerate(argv):
+        if arg == "--config-filename" and i + 1 < len(argv):
+            return argv[i + 1]
+        if arg.startswith("--config-filename="):
+            return arg.split("=", 1)[1]
+    print("usage: python -m src.client --config-filename CONFIG_FILENAME")
+    sys.exit(2)
+
+
+if __name__ == "__main__":
+    main(parse_config_filename(sys.argv[1:]))
@@ -1,19 +1,43 @@
-"""Clipboard operations."""
+"""Clipboard operations.
 
+The clipboard itself is accessed through the backend in use (see
+clipboard_backends).
+"""
+
+import os
 import sys
 from pathlib import Path
 
-try:
-    import pyperclip
-except ImportError:
-    print("エラー: pyperclipがインストールされていません")
-    print("pip install pyperclip を実行してください")
-    sys.exit(1)
+from .clipboard_backends import get_backend
+
+# Characters encoded and written at a time, so a large clipboard is never
+# held a second time as one encoded copy
+WRITE_CHUNK_SIZE = 1 << 20
+
+# Directory of the temp file in RAM-backed storage (clipboard_temp_file_in_memory)
+MEMORY_DIR_NAME = "cat-clipboard-launcher"
 
 
-def get_clipboard_content() -> str:
+def paste_clipboard() -> str:
+    """Read the clipboard without reporting failures.
+
+    Returns:
+        Clipboard text, possibly empty
+
+    Raises:
+        SystemExit: If pyperclip is not installed
+        Exception: If the clipboard cannot be read
+    """
+    return get_backend().paste()
+
+
+def get_clipboard_content(paste=paste_clipboard) -> str:
     """Get text content from clipboard.
 
+    Args:
+        paste: Function returning the clipboard text, e.g. the result of a
+            read started in the background (see startup)
+
     Returns:
         Clipboard text content
 
@@ -21,7 +45,7 @@ def get_clipboard_content() -> str:
         SystemExit: If clipboard is empty or not text
     """
     try:
-        content = pyperclip.paste()
+        content = paste()
         if not content:
             print("テキストが取得できません")
             sys.exit(0)
@@ -31,27 +55,194 @@ def get_clipboard_content() -> str:
         sys.exit(1)
 
 
-def save_to_temp_file(content: str, temp_file_path: Path) -> None:
+def get_digest_path(temp_file_path: Path) -> Path:
+    """Get the path of the record of what the temp file holds.
+
+    Args:
+        temp_file_path: Path to temporary file
+
+    Returns:
+        Path next to the temp file
+    """
+    return temp_file_path.with_name(temp_file_path.name + ".digest")
+
+
+def get_memory_dir() -> Path | None:
+    """Get a directory of the user's own in RAM-backed storage, creating it.
+
+    $XDG_RUNTIME_DIR is used where set (a per-user tmpfs on Linux), then
+    /dev/shm. A directory under /dev/shm that another user created, or that
+    others can access, is not used.
+
+    Returns:
+        Directory path, or None if no RAM-backed storage is available
+        (e.g. on Windows and macOS)
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        memory_dir = Path(runtime_dir) / MEMORY_DIR_NAME
+    elif os.path.isdir("/dev/shm") and hasattr(os, "getuid"):
+        memory_dir = Path("/dev/shm") / f"{MEMORY_DIR_NAME}-{os.getuid()}"
+    else:
+        return None
+
+    try:
+        memory_dir.mkdir(mode=0o700, exist_ok=True)
+        stat = os.lstat(memory_dir)
+    except OSError:
+        return None
+    if not memory_dir.is_dir() or memory_dir.is_symlink() or stat.st_uid != os.getuid() or stat.st_mode & 0o077:
+        return None
+    return memory_dir
+
+
+def get_memory_temp_file_path(temp_file_path: Path) -> Path:
+    """Get the temp file path in RAM-backed storage, falling back to disk.
+
+    Args:
+        temp_file_path: Configured path to temporary file
+
+    Returns:
+        Path of the same name in the directory from get_memory_dir, or
+        temp_file_path if there is none
+    """
+    memory_dir = get_memory_dir()
+    if memory_dir is None:
+        print("警告: メモリ上に一時ファイルを置けないため、clipboard_temp_fileに保存します")
+        return temp_file_path
+    return memory_dir / temp_file_path.name
+
+
+def write_content(f, content: str, content_hash=None) -> None:
+    """Write text to a binary file as a UTF-8 text mode file would.
+
+    Each chunk is encoded once, for both the hash and the file, and
+    newlines are translated to the platform's line separator.
+
+    Args:
+        f: File opened for binary writing
+        content: Text content to write
+        content_hash: Hash from match_cache.new_content_hash to feed the
+            encoded content to, or None
+    """
+    newline = os.linesep.encode("ascii")
+    for start in range(0, len(content), WRITE_CHUNK_SIZE):
+        data = content[start : start + WRITE_CHUNK_SIZE].encode("utf-8")
+        if content_hash is not None:
+            content_hash.update(data)
+        f.write(data if newline == b"\n" else data.replace(b"\n", newline))
+
+
+def read_temp_file_record(temp_file_path: Path) -> tuple | None:
+    """Read what the temp file was last written with, if it is unchanged since.
+
+    The record written with the file is checked, not the file itself: a
+    file changed since (e.g. edited by a command) has another size or
+    modification time.
+
+    Args:
+        temp_file_path: Path to temporary file
+
+    Returns:
+        Tuple of (content length in characters, content digest), or None
+        if there is no record or the file changed since
+    """
+    try:
+        stat = temp_file_path.stat()
+        file_size, mtime_ns, length, digest = get_digest_path(temp_file_path).read_text(encoding="utf-8").split()
+    except (OSError, ValueError):
+        return None
+    if (file_size, mtime_ns) != (str(stat.st_size), str(stat.st_mtime_ns)):
+        return None
+    return int(length), digest
+
+
+def write_temp_file(content: str, temp_file_path: Path, digest: str | None = None) -> bool:
+    """Write clipboard content to the temporary file without reporting failures.
+
+    Skipped when the file already holds the same content: the lengths are
+    compared first, so only content of the same length is hashed.
+
+    Args:
+        content: Text content to save
+        temp_file_path: Path to temporary file
+        digest: Digest of content from match_cache.content_digest, if
+            already computed
+
+    Returns:
+        True if the file was written, False if it already held the content
+
+    Raises:
+        OSError: If file write fails
+    """
+    from .match_cache import content_digest, new_content_hash
+
+    record = read_temp_file_record(temp_file_path)
+    if record is not None and record[0] == len(content):
+        digest = digest or content_digest(content)
+        if record[1] == digest:
+            return False
+
+    # Ensure parent directory exists
+    temp_file_path.parent.mkdir(parents=True, exist_ok=True)
+
+    content_hash = None if digest else new_content_hash()
+    with open(temp_file_path, "wb") as f:
+        write_content(f, content, content_hash)
+
+    stat = temp_file_path.stat()
+    digest = digest or content_hash.hexdigest()
+    get_digest_path(temp_file_path).write_text(
+        f"{stat.st_size} {stat.st_mtime_ns} {len(content)} {digest}", encoding="utf-8"
+    )
+    return True
+
+
+def save_to_temp_file(content: str, temp_file_path: Path, digest: str | None = None) -> None:
     """Save clipboard content to temporary file.
 
     Args:
         content: Text content to save
         temp_file_path: Path to temporary file
+        digest: Digest of content from match_cache.content_digest, if
+            already computed
 
     Raises:
         SystemExit: If file write fails
     """
     try:
-        # Ensure parent directory exists
-        temp_file_path.parent.mkdir(parents=True, exist_ok=True)
-
-        with open(temp_file_path, "w", encoding="utf-8") as f:
-            f.write(content)
+        write_temp_file(content, temp_file_path, digest)
     except Exception as e:
         print(f"エラー: クリップボード内容の保存に失敗しました: {e}")
         sys.exit(1)
 
 
+def save_clipboard_file(content: str, menu: dict, digest: str | None = None) -> Path:
+    """Save clipboard content where the commands of a menu read it.
+
+    Args:
+        content: Text content to save
+        menu: Menu dictionary (see menu)
+        digest: Digest of content from match_cache.content_digest, if
+            already computed
+
+    Returns:
+        Path of the saved file: clipboard_temp_file, or an entry of the
+        content-addressed store when clipboard_temp_dir is set
+
+    Raises:
+        SystemExit: If file write fails
+    """
+    if menu["temp_store"] is not None:
+        from .temp_store import save_to_store
+
+        return save_to_store(content, menu["temp_store"], digest)
+
+    temp_file_path = Path(menu["temp_file"])
+    save_to_temp_file(content, temp_file_path, digest)
+    return temp_file_path
+
+
 def write_output_to_clipboard(output_file_path: Path) -> None:
     """Read output file and write its content to clipboard.
 
@@ -66,7 +257,7 @@ def write_output_to_clipboard(output_file_path: Path) -> None:
         with open(output_file_path, "r", encoding="utf-8") as f:
             content = f.read()
 
-        pyperclip.copy(content)
+        get_backend().copy(content)
         print(f"出力をクリップボードに書き戻しました ({len(content)} 文字)")
     except Exception as e:
         print(f"警告: 出力ファイルの読み取りまたはクリップボードへの書き込みに失敗しました: {e}")
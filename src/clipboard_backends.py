@@ -0,0 +1,240 @@
+"""Clipboard backends behind clipboard.get_clipboard_content and write_output_to_clipboard.
+
+A backend is an object with a name and paste() and copy(text) methods;
+failures are raised and reported by the clipboard module. Available:
+
+- "pyperclip": pyperclip. On Linux every call runs a helper process
+  (xclip, xsel, wl-paste), which is cheap to set up but costs a fork per
+  call.
+- "tk": an X11 connection kept open by Tk on a dedicated thread, so reads
+  after the first are in-process requests to the selection owner. Opening
+  it costs more than one helper process, so it pays off in the daemon,
+  which reads on every launch and on every watcher poll. Writes go through
+  pyperclip: on X11 the clipboard owner must outlive the copy, which the
+  helper processes pyperclip starts do.
+- "memory": text held in memory, for tests and benchmarks.
+
+The backend is picked by the CLIPBOARD_LAUNCHER_BACKEND environment
+variable, or by default ("auto") pyperclip for a launch and tk for the
+daemon where an X display is available, falling back to pyperclip.
+"""
+
+import os
+import sys
+import threading
+
+# Environment variable naming the backend to use
+BACKEND_ENV = "CLIPBOARD_LAUNCHER_BACKEND"
+
+# Seconds to wait for the Tk thread to open its display
+TK_START_TIMEOUT = 5
+
+
+def import_pyperclip():
+    """Import pyperclip on first clipboard access.
+
+    pyperclip probes for a clipboard mechanism when imported, so it is only
+    loaded by the code paths that touch the clipboard.
+
+    Returns:
+        The pyperclip module
+
+    Raises:
+        SystemExit: If pyperclip is not installed
+    """
+    try:
+        import pyperclip
+    except ImportError:
+        print("エラー: pyperclipがインストールされていません")
+        print("pip install pyperclip を実行してください")
+        sys.exit(1)
+    return pyperclip
+
+
+class PyperclipBackend:
+    """Clipboard access through pyperclip."""
+
+    __slots__ = ()
+
+    name = "pyperclip"
+
+    def paste(self) -> str:
+        """Read the clipboard.
+
+        Returns:
+            Clipboard text, possibly empty
+        """
+        return import_pyperclip().paste()
+
+    def copy(self, text: str) -> None:
+        """Write text to the clipboard.
+
+        Args:
+            text: Text to write
+        """
+        import_pyperclip().copy(text)
+
+
+class MemoryBackend:
+    """Clipboard held in memory, for tests and benchmarks."""
+
+    __slots__ = ("text",)
+
+    name = "memory"
+
+    def __init__(self, text: str = "") -> None:
+        self.text = text
+
+    def paste(self) -> str:
+        """Read the clipboard.
+
+        Returns:
+            Clipboard text, possibly empty
+        """
+        return self.text
+
+    def copy(self, text: str) -> None:
+        """Write text to the clipboard.
+
+        Args:
+            text: Text to write
+        """
+        self.text = text
+
+
+class TkBackend:
+    """Clipboard reads over an X11 connection kept open by Tk.
+
+    Tk may only be used from the thread that created it, so the connection
+    lives on a dedicated daemon thread that serves reads from any thread.
+    """
+
+    __slots__ = ("_requests", "_thread")
+
+    name = "tk"
+
+    def __init__(self) -> None:
+        """Open the connection.
+
+        Raises:
+            Exception: If tkinter is missing or no display can be opened
+        """
+        import queue
+
+        self._requests = queue.SimpleQueue()
+        started = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._serve, args=(started,), daemon=True)
+        self._thread.start()
+        error = started.get(timeout=TK_START_TIMEOUT)
+        if error is not None:
+            raise error
+
+    def _serve(self, started) -> None:
+        try:
+            import tkinter
+
+            root = tkinter.Tk()
+            root.withdraw()
+        except Exception as e:
+            started.put(e)
+            return
+        started.put(None)
+
+        while True:
+            reply = self._requests.get()
+            try:
+                text = root.clipboard_get()
+            except tkinter.TclError:
+                # Empty clipboard, or no text on it
+                text = ""
+            except Exception as e:
+                text = e
+            reply.put(text)
+
+    def paste(self) -> str:
+        """Read the clipboard.
+
+        Returns:
+            Clipboard text, possibly empty
+        """
+        import queue
+
+        reply = queue.SimpleQueue()
+        self._requests.put(reply)
+        text = reply.get()
+        if isinstance(text, Exception):
+            raise text
+        return text
+
+    def copy(self, text: str) -> None:
+        """Write text to the clipboard, through pyperclip.
+
+        Args:
+            text: Text to write
+        """
+        import_pyperclip().copy(text)
+
+
+BACKENDS = {
+    "pyperclip": PyperclipBackend,
+    "tk": TkBackend,
+    "memory": MemoryBackend,
+}
+
+_backend = None
+
+
+def select_backend(resident: bool = False):
+    """Create the backend to use.
+
+    Args:
+        resident: Whether the process stays running (the daemon), so a
+            backend that is costly to open but cheap per call pays off
+
+    Returns:
+        Clipboard backend
+    """
+    name = os.environ.get(BACKEND_ENV, "auto")
+    if name == "auto":
+        if not (resident and sys.platform.startswith("linux") and os.environ.get("DISPLAY")):
+            return PyperclipBackend()
+        try:
+            return TkBackend()
+        except Exception:
+            return PyperclipBackend()
+
+    if name not in BACKENDS:
+        print(f"警告: 不明なクリップボードバックエンドです ({name})。pyperclipを使用します")
+        return PyperclipBackend()
+    try:
+        return BACKENDS[name]()
+    except Exception as e:
+        print(f"警告: クリップボードバックエンド {name} を使用できません: {e}。pyperclipを使用します")
+        return PyperclipBackend()
+
+
+def get_backend():
+    """Get the backend in use, selecting it on first use.
+
+    Returns:
+        Clipboard backend
+    """
+    global _backend
+    if _backend is None:
+        _backend = select_backend()
+    return _backend
+
+
+def set_backend(backend):
+    """Replace the backend in use.
+
+    Args:
+        backend: Clipboard backend, or None to select again on next use
+
+    Returns:
+        Previous backend, or None
+    """
+    global _backend
+    previous = _backend
+    _backend = backend
+    return previous
@@ -1,10 +1,27 @@
 """Configuration loading and management."""
 
+import re
 import sys
 from pathlib import Path
 
 import tomllib
 
+from .pattern import Pattern
+from .regex_analysis import analyze_regex
+from .scan_scope import parse_scope
+
+# Regex flags that can be enabled per pattern with the "flags" field
+REGEX_FLAGS = {
+    "IGNORECASE": re.IGNORECASE,
+    "MULTILINE": re.MULTILINE,
+    "DOTALL": re.DOTALL,
+    "VERBOSE": re.VERBOSE,
+    "ASCII": re.ASCII,
+}
+
+# Values of the "input" field: "stdin" pipes the clipboard to the command
+INPUT_MODES = ("file", "stdin")
+
 
 def load_config(config_path: Path) -> dict:
     """Load TOML configuration file.
@@ -43,20 +60,284 @@ def get_temp_file_path(config: dict) -> Path:
     return Path(config.get("clipboard_temp_file", default_temp_file))
 
 
-def get_patterns(config: dict) -> list:
-    """Get patterns list from config.
+def get_temp_file_in_memory(config: dict) -> bool:
+    """Get whether the temp file is kept in RAM-backed storage.
+
+    Args:
+        config: Configuration dictionary
+
+    Returns:
+        True if clipboard_temp_file_in_memory is enabled
+    """
+    return config.get("clipboard_temp_file_in_memory", False)
+
+
+# Default budgets of the content-addressed temp file store
+DEFAULT_TEMP_DIR_MAX_BYTES = 100 * 1024 * 1024
+DEFAULT_TEMP_DIR_MAX_AGE = 24 * 60 * 60
+
+
+def get_temp_store_settings(config: dict) -> dict | None:
+    """Get the content-addressed temp file store settings from config.
 
     Args:
         config: Configuration dictionary
 
     Returns:
-        List of pattern dictionaries
+        Dictionary with "dir", "max_bytes" and "max_age" (seconds), or None
+        if clipboard_temp_dir is not set and clipboard_temp_file is used
+    """
+    if "clipboard_temp_dir" not in config:
+        return None
+    return {
+        "dir": str(Path(config["clipboard_temp_dir"]).resolve()),
+        "max_bytes": config.get("clipboard_temp_dir_max_bytes", DEFAULT_TEMP_DIR_MAX_BYTES),
+        "max_age": config.get("clipboard_temp_dir_max_age", DEFAULT_TEMP_DIR_MAX_AGE),
+    }
+
+
+# Ways of cutting the scan window out of oversized clipboard content
+SCAN_WINDOW_MODES = ("head", "head_tail")
+
+
+def get_scan_window_settings(config: dict) -> tuple[int | None, str]:
+    """Get the scan window settings from config.
+
+    Args:
+        config: Configuration dictionary
+
+    Returns:
+        Tuple of (max_scan_bytes or None for no limit, scan_window mode)
 
     Raises:
-        SystemExit: If no patterns are defined
+        SystemExit: If scan_window is not a known mode
+    """
+    mode = config.get("scan_window", "head")
+    if mode not in SCAN_WINDOW_MODES:
+        print(
+            f"エラー: scan_windowの値が不正です ({mode}): {', '.join(SCAN_WINDOW_MODES)} のいずれかを指定してください"
+        )
+        sys.exit(1)
+    return config.get("max_scan_bytes"), mode
+
+
+def get_match_timeouts(config: dict) -> tuple[float | None, float | None]:
+    """Get the match time budgets from config.
+
+    Args:
+        config: Configuration dictionary
+
+    Returns:
+        Tuple of (budget per pattern, budget for the whole match phase) in
+        seconds, each None if not set; time-budgeted matching is enabled
+        when either is set
+    """
+    return config.get("match_timeout"), config.get("match_phase_timeout")
+
+
+def get_parallel_threshold(config: dict) -> int:
+    """Get the work estimate from which matching runs in parallel.
+
+    Args:
+        config: Configuration dictionary
+
+    Returns:
+        Threshold on patterns x content characters
+    """
+    from .parallel_matcher import DEFAULT_PARALLEL_THRESHOLD
+
+    return config.get("parallel_threshold", DEFAULT_PARALLEL_THRESHOLD)
+
+
+def get_match_cache_settings(config: dict) -> tuple[Path, int]:
+    """Get the match result cache settings from config.
+
+    Args:
+        config: Configuration dictionary
+
+    Returns:
+        Tuple of (cache directory, maximum number of entries); the cache is
+        disabled when the number of entries is 0
+    """
+    default_cache_dir = get_temp_file_path(config).with_name("match_cache")
+    return Path(config.get("match_cache_dir", default_cache_dir)), config.get("match_cache_size", 0)
+
+
+def get_slow_pattern_history_path(config: dict) -> Path:
+    """Get slow pattern history file path from config or use default.
+
+    Args:
+        config: Configuration dictionary
+
+    Returns:
+        Path to slow pattern history file (next to the temporary file by default)
+    """
+    default_history_file = get_temp_file_path(config).with_name("slow_patterns.json")
+    return Path(config.get("slow_pattern_history_file", default_history_file))
+
+
+def _get_field(pattern: dict, field: str, expected_type: type, default):
+    """Get a pattern field, checking its type.
+
+    Args:
+        pattern: Pattern dictionary from config
+        field: Field name
+        expected_type: Type the field must have when present
+        default: Value used when the field is absent
+
+    Returns:
+        Field value, or default if absent
+
+    Raises:
+        ValueError: If the field has another type
+    """
+    value = pattern.get(field, default)
+    if value is default:
+        return value
+    # bool is a subclass of int, but true/false is never a valid size
+    if not isinstance(value, expected_type) or (expected_type is int and isinstance(value, bool)):
+        raise ValueError(f"{field} must be of type {expected_type.__name__}")
+    return value
+
+
+def compile_pattern(pattern: dict) -> Pattern:
+    """Compile a pattern definition from config.
+
+    Args:
+        pattern: Pattern dictionary from config
+
+    Returns:
+        Pattern with defaults resolved, the regex compiled and the analysis
+        from analyze_regex filled in
+
+    Raises:
+        re.error: If the regex is invalid or an unknown flag is specified
+        ValueError: If a field has the wrong type, or scope, input,
+            min_bytes or max_bytes is invalid
+    """
+    if not isinstance(pattern, dict):
+        raise ValueError("pattern must be a table")
+
+    input_mode = _get_field(pattern, "input", str, "file")
+    if input_mode not in INPUT_MODES:
+        raise ValueError(f"input must be one of {', '.join(INPUT_MODES)}")
+
+    for size_field in ("min_bytes", "max_bytes"):
+        size = _get_field(pattern, size_field, int, None)
+        if size is not None and size < 0:
+            raise ValueError(f"{size_field} must be a non-negative integer")
+
+    flags = 0
+    for flag_name in _get_field(pattern, "flags", list, []):
+        if flag_name not in REGEX_FLAGS:
+            raise re.error(f"unknown flag {flag_name!r}")
+        flags |= REGEX_FLAGS[flag_name]
+
+    compiled = re.compile(_get_field(pattern, "regex", str, ""), flags)
+    analysis = analyze_regex(compiled)
+    return Pattern(
+        name=_get_field(pattern, "name", str, "unknown"),
+        regex=compiled.pattern,
+        compiled=compiled,
+        flags=flags,
+        command=_get_field(pattern, "command", str, ""),
+        output_file=_get_field(pattern, "output_file", str, None),
+        write_output_to_clipboard=_get_field(pattern, "write_output_to_clipboard", bool, False),
+        input=input_mode,
+        scope=parse_scope(_get_field(pattern, "scope", str, "all")),
+        min_bytes=pattern.get("min_bytes"),
+        max_bytes=pattern.get("max_bytes"),
+        literal_prefix=analysis["literal_prefix"],
+        required_literals=tuple(analysis["required_literals"]),
+        line_local=analysis["line_local"],
+        anchor=analysis["anchor"],
+        max_width=analysis["max_width"],
+        max_reach=analysis["max_reach"],
+    )
+
+
+def get_include_globs(config: dict) -> list:
+    """Get the globs of the pattern shard files included by a config.
+
+    Args:
+        config: Configuration dictionary
+
+    Returns:
+        List of glob strings (empty if include is not set)
+
+    Raises:
+        SystemExit: If include is not a list of strings
+    """
+    include = config.get("include", [])
+    if not isinstance(include, list):
+        print(f"エラー: includeはファイルパターンのリストで指定してください ({include!r})")
+        sys.exit(1)
+    for pattern in include:
+        if not isinstance(pattern, str) or not pattern:
+            print(f"エラー: includeのファイルパターンが不正です ({pattern!r})")
+            sys.exit(1)
+    return include
+
+
+def get_pattern_definitions(config: dict) -> list:
+    """Get the pattern definitions from config.
+
+    Args:
+        config: Configuration dictionary
+
+    Returns:
+        List of pattern dictionaries as written in the config
+
+    Raises:
+        SystemExit: If include is invalid, or no patterns are defined, either
+            directly or through included pattern files
     """
     patterns = config.get("patterns", [])
-    if not patterns:
+    if not get_include_globs(config) and not patterns:
         print("エラー: 設定ファイルにpatternsが定義されていません")
         sys.exit(1)
     return patterns
+
+
+def compile_patterns(patterns: list) -> tuple[list, list]:
+    """Compile pattern definitions, collecting warnings for invalid ones.
+
+    Args:
+        patterns: List of pattern dictionaries from config
+
+    Returns:
+        Tuple of (compiled Patterns, warning messages for the patterns that
+        were left out)
+    """
+    compiled_patterns = []
+    warnings = []
+    for pattern in patterns:
+        name = pattern.get("name", "unknown") if isinstance(pattern, dict) else "unknown"
+        try:
+            compiled_patterns.append(compile_pattern(pattern))
+        except re.error as e:
+            warnings.append(f"警告: 無効な正規表現をスキップしました ({name}): {e}")
+        except ValueError as e:
+            warnings.append(f"警告: 無効なパターン設定をスキップしました ({name}): {e}")
+    return compiled_patterns, warnings
+
+
+def get_patterns(config: dict) -> list:
+    """Get compiled patterns list from config.
+
+    Invalid regexes and misconfigured fields are reported once here and
+    left out of the result, so matchers and the launcher never see them.
+
+    Args:
+        config: Configuration dictionary
+
+    Returns:
+        List of compiled Patterns
+
+    Raises:
+        SystemExit: If no patterns are defined
+    """
+    compiled_patterns, warnings = compile_patterns(get_pattern_definitions(config))
+    for warning in warnings:
+        print(warning)
+    return compiled_patterns
@@ -0,0 +1,169 @@
+"""Compiled config snapshot that skips TOML parsing on unchanged configs.
+
+The snapshot is a pickle written next to the config file. It holds the
+parsed config and the compiled, analysed pattern table, preceded by a
+header recording the config file's mtime, size and digest. Unpickling
+compiles each regex again from its source; what loading it saves is TOML
+parsing, pattern validation and regex analysis. Anyone who can
+write the snapshot can also edit the config and its commands, so loading
+the pickle does not widen what a config directory already trusts.
+"""
+
+import hashlib
+import pickle
+import sys
+import time
+from pathlib import Path
+
+from .config import compile_patterns, get_pattern_definitions, load_config
+
+# Bumped whenever the pattern table or the regex analysis changes shape or results
+SNAPSHOT_VERSION = 6
+
+# A config modified this close to the snapshot write may have been edited
+# again within the file system's mtime resolution, so it is hashed anyway
+RACY_WINDOW_NS = 2_000_000_000
+
+
+def get_snapshot_path(config_path: Path) -> Path:
+    """Get the snapshot path of a config file.
+
+    Args:
+        config_path: Path to config file
+
+    Returns:
+        Path to the snapshot next to the config file
+    """
+    return config_path.with_name(config_path.name + ".snapshot")
+
+
+def _snapshot_version() -> tuple:
+    """Get the version a snapshot must have been written with.
+
+    Returns:
+        Tuple of the snapshot format version and the Python version, as
+        compiled regexes and their analysis depend on the re module
+    """
+    return (SNAPSHOT_VERSION, sys.version_info[:2])
+
+
+def load_snapshot(config_path: Path) -> tuple[dict, list, list] | None:
+    """Load the snapshot of a config file if it is still valid.
+
+    The snapshot is valid when the config file's mtime and size are
+    unchanged. If either changed, or the mtime is too close to the snapshot
+    write to be trusted, the file is hashed, and a snapshot of identical
+    contents is still used (and refreshed).
+
+    Args:
+        config_path: Path to config file
+
+    Returns:
+        Tuple of (config, compiled patterns, warning messages), or None if
+        there is no valid snapshot
+    """
+    snapshot_path = get_snapshot_path(config_path)
+    try:
+        stat = config_path.stat()
+        with open(snapshot_path, "rb") as f:
+            header = pickle.load(f)
+            if header["version"] != _snapshot_version():
+                return None
+            unchanged = (
+                header["mtime_ns"] == stat.st_mtime_ns
+                and header["size"] == stat.st_size
+                and stat.st_mtime_ns + RACY_WINDOW_NS < header["written_ns"]
+            )
+            if not unchanged:
+                data = config_path.read_bytes()
+                if hashlib.blake2b(data, digest_size=16).hexdigest() != header["digest"]:
+                    return None
+            config, patterns, warnings = pickle.load(f)
+    except Exception:
+        # Missing, unreadable or corrupt snapshots fall back to a full parse
+        return None
+
+    if not unchanged:
+        save_snapshot(config_path, stat, header["digest"], config, patterns, warnings)
+    return config, patterns, warnings
+
+
+def save_snapshot(config_path: Path, stat, digest: str, config: dict, patterns: list, warnings: list) -> None:
+    """Save the snapshot of a config file.
+
+    The snapshot is only an accelerator, so a config directory that cannot
+    be written to (e.g. a shared read-only config) is silently left alone.
+
+    Args:
+        config_path: Path to config file
+        stat: os.stat_result of the config file taken before it was read
+        digest: Digest of the config file contents
+        config: Parsed config
+        patterns: Compiled patterns
+        warnings: Warning messages for the patterns that were left out
+    """
+    header = {
+        "version": _snapshot_version(),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "digest": digest,
+        "written_ns": time.time_ns(),
+    }
+    snapshot_path = get_snapshot_path(config_path)
+    temp_path = snapshot_path.with_name(snapshot_path.name + ".tmp")
+    try:
+        with open(temp_path, "wb") as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump((config, patterns, warnings), f, protocol=pickle.HIGHEST_PROTOCOL)
+        temp_path.replace(snapshot_path)
+    except OSError:
+        temp_path.unlink(missing_ok=True)
+
+
+def load_pattern_file(toml_path: Path) -> tuple[dict, list]:
+    """Load a TOML file and compile its patterns, from the snapshot if valid.
+
+    Args:
+        toml_path: Path to a config or pattern shard file
+
+    Returns:
+        Tuple of (parsed file, compiled Patterns)
+
+    Raises:
+        SystemExit: If the file is missing or invalid
+    """
+    snapshot = load_snapshot(toml_path)
+    if snapshot is not None:
+        data, patterns, warnings = snapshot
+    else:
+        # Stat and hash before parsing, so an edit made meanwhile invalidates the snapshot
+        try:
+            stat = toml_path.stat()
+            digest = hashlib.blake2b(toml_path.read_bytes(), digest_size=16).hexdigest()
+        except OSError:
+            stat = digest = None
+        data = load_config(toml_path)
+        patterns, warnings = compile_patterns(data.get("patterns", []))
+        if stat is not None:
+            save_snapshot(toml_path, stat, digest, data, patterns, warnings)
+
+    for warning in warnings:
+        print(warning)
+    return data, patterns
+
+
+def load_config_and_patterns(config_path: Path) -> tuple[dict, list]:
+    """Load the config and its compiled patterns, from the snapshot if valid.
+
+    Args:
+        config_path: Path to config.toml file
+
+    Returns:
+        Tuple of (config dictionary, compiled Patterns)
+
+    Raises:
+        SystemExit: If the config file is missing, invalid or defines no patterns
+    """
+    config, patterns = load_pattern_file(config_path)
+    get_pattern_definitions(config)
+    return config, patterns
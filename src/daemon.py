@@ -0,0 +1,412 @@
+"""Resident launcher daemon.
+
+Started with --daemon, it keeps the parsed config and its compiled
+patterns in memory and answers menu requests from src.client. For each
+request it reads the clipboard, matches and renders the menu exactly as
+the in-process launcher does; the client then shows the menu and runs the
+selected command itself, so the daemon never executes anything. The
+clipboard temp file is only written when the client asks for it, once a
+command that uses it is chosen, and a command reading its standard input
+gets the content from the daemon; the daemon keeps the content it last
+served until then.
+
+The config file is checked for changes (mtime and size) on every request
+and reloaded when it changed. Included pattern shards are loaded per
+request behind their gates, from their snapshots, as in process.
+
+With --watch, a watcher thread (see watcher) prepares the menu whenever
+the clipboard changes, and a launch on the same content gets it without
+any matching.
+
+The endpoint is a Unix socket next to the config file, created readable
+by its owner only. Where Unix sockets are not available (Windows), the
+daemon listens on a loopback TCP port instead and writes the port and a
+random access token to that path; requests without the token are ignored.
+That file is not restricted beyond the access rights it inherits from the
+config directory, and the client does not authenticate the daemon, so the
+config directory must not be readable or writable by other users.
+"""
+
+import hmac
+import marshal
+import os
+import secrets
+import signal
+import socket
+import sys
+import threading
+import traceback
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+from .client import PROTOCOL_VERSION, TOKEN_LENGTH, connect, encode_token, get_socket_path
+from .clipboard import get_clipboard_content, save_clipboard_file
+from .clipboard_backends import select_backend, set_backend
+from .config_snapshot import load_config_and_patterns
+from .launcher import build_menu
+from .match_cache import content_digest
+
+# Requests are tiny; anything larger is not from the client
+MAX_REQUEST_BYTES = 1 << 16
+
+# Seconds a connected client has to send its request
+REQUEST_TIMEOUT = 5
+
+
+def daemon_is_running(socket_path: str) -> bool:
+    """Check whether a daemon is listening on an endpoint.
+
+    Args:
+        socket_path: Endpoint path from client.get_socket_path
+
+    Returns:
+        True if a connection was accepted
+    """
+    try:
+        sock, _token = connect(socket_path)
+    except (OSError, ValueError):
+        return False
+    sock.close()
+    return True
+
+
+def open_endpoint(socket_path: str) -> tuple[socket.socket, str]:
+    """Create the daemon endpoint, replacing a stale one.
+
+    Args:
+        socket_path: Endpoint path from client.get_socket_path
+
+    Returns:
+        Tuple of (listening socket, access token clients must send)
+
+    Raises:
+        SystemExit: If a daemon is already running or the endpoint cannot be created
+    """
+    if os.path.exists(socket_path):
+        if daemon_is_running(socket_path):
+            print(f"エラー: デーモンは既に起動しています ({socket_path})")
+            sys.exit(1)
+        os.unlink(socket_path)
+
+    try:
+        if hasattr(socket, "AF_UNIX"):
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            # Readable by the owner only, from the moment it exists
+            old_umask = os.umask(0o177)
+            try:
+                server.bind(socket_path)
+            finally:
+                os.umask(old_umask)
+            token = ""
+        else:
+            server = socket.create_server(("127.0.0.1", 0))
+            token = secrets.token_hex(TOKEN_LENGTH // 2)
+            # On Windows the mode only controls the read-only flag; access follows the directory's ACLs
+            fd = os.open(socket_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with open(fd, "w", encoding="utf-8") as f:
+                f.write(f"{server.getsockname()[1]} {token}\n")
+    except OSError as e:
+        print(f"エラー: デーモンの待ち受けを開始できませんでした ({socket_path}): {e}")
+        sys.exit(1)
+
+    server.listen()
+    return server, token
+
+
+def get_config_stat(config_path: Path) -> tuple | None:
+    """Get the stat a loaded config is checked against.
+
+    Args:
+        config_path: Path to config file
+
+    Returns:
+        Tuple of (mtime in ns, size), or None if the file cannot be read
+    """
+    try:
+        stat = config_path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_config_state(config_path: Path) -> tuple:
+    """Load the config, capturing what loading prints.
+
+    Args:
+        config_path: Path to config file
+
+    Returns:
+        Tuple of (config stat, config, compiled Patterns, printed warnings),
+        the warnings being replayed to every client as the launcher would
+        print them
+
+    Raises:
+        SystemExit: If the config file is missing, invalid or defines no patterns
+    """
+    config_stat = get_config_stat(config_path)
+    output = StringIO()
+    try:
+        with redirect_stdout(output):
+            config, patterns = load_config_and_patterns(config_path)
+    except SystemExit:
+        # The error goes wherever output currently goes: the terminal, or the client
+        print(output.getvalue(), end="")
+        raise
+    return config_stat, config, patterns, output.getvalue()
+
+
+def read_request(conn: socket.socket) -> bytes:
+    """Read a whole request from a client.
+
+    Args:
+        conn: Accepted connection
+
+    Returns:
+        Request bytes, cut off after MAX_REQUEST_BYTES
+    """
+    chunks = []
+    size = 0
+    while size < MAX_REQUEST_BYTES and (chunk := conn.recv(MAX_REQUEST_BYTES - size)):
+        chunks.append(chunk)
+        size += len(chunk)
+    return b"".join(chunks)
+
+
+class DaemonState:
+    """Loaded config and the menu prepared ahead, shared by requests and the watcher.
+
+    Attributes:
+        config_path: Path to config file
+        loaded: Loaded config state from load_config_state, or None
+        prepared: Tuple of (content digest, config stat, printed output,
+            menu) prepared by the watcher, or None
+        served: Tuple of (content digest, content, menu) of the last menu
+            served, for the client to have saved, or None
+        lock: Held while matching, so requests and the watcher take turns
+            (output capture redirects the process-wide stdout)
+    """
+
+    __slots__ = ("config_path", "loaded", "prepared", "served", "lock")
+
+    def __init__(self, config_path: Path, loaded: tuple | None = None) -> None:
+        self.config_path = config_path
+        self.loaded = loaded
+        self.prepared = None
+        self.served = None
+        self.lock = threading.Lock()
+
+    def refresh(self) -> tuple:
+        """Get the loaded config, reloading it if the file changed.
+
+        Returns:
+            Loaded config state
+
+        Raises:
+            SystemExit: If the changed config cannot be loaded
+        """
+        if self.loaded is None or self.loaded[0] != get_config_stat(self.config_path):
+            self.loaded = load_config_state(self.config_path)
+        return self.loaded
+
+
+def prepare_ahead(daemon_state: DaemonState, content: str, digest: str) -> None:
+    """Prepare the menu of new clipboard content for the next launch.
+
+    Called by the watcher.
+
+    Args:
+        daemon_state: Shared daemon state
+        content: Clipboard text content
+        digest: Digest of content from match_cache.content_digest
+    """
+    with daemon_state.lock:
+        output = StringIO()
+        with redirect_stdout(output):
+            try:
+                config_stat, config, patterns, warnings = daemon_state.refresh()
+                print(warnings, end="")
+                menu = build_menu(config, patterns, daemon_state.config_path, content)
+            except SystemExit:
+                # Reported when a launch hits the same problem
+                return
+        daemon_state.prepared = (digest, config_stat, output.getvalue(), menu)
+
+
+def handle_request(daemon_state: DaemonState) -> dict:
+    """Build the response to a menu request.
+
+    A menu the watcher prepared is handed over when the clipboard still
+    has the content it was prepared for and the config is unchanged, so
+    no matching happens while the user waits.
+
+    Args:
+        daemon_state: Shared daemon state
+
+    Returns:
+        Response dictionary, with the digest of the content the menu is
+        for as "content_digest"
+    """
+    output = StringIO()
+    menu = None
+    digest = None
+    exit_code = None
+    with daemon_state.lock, redirect_stdout(output):
+        try:
+            config_stat, config, patterns, warnings = daemon_state.refresh()
+            content = get_clipboard_content()
+            digest = content_digest(content)
+            prepared = daemon_state.prepared
+            if prepared is not None and prepared[:2] == (digest, config_stat):
+                _digest, _config_stat, prepared_output, menu = prepared
+                print(prepared_output, end="")
+            else:
+                print(warnings, end="")
+                menu = build_menu(config, patterns, daemon_state.config_path, content)
+            daemon_state.served = (digest, content, menu)
+        except SystemExit as e:
+            exit_code = e.code
+    return {
+        "version": PROTOCOL_VERSION,
+        "output": output.getvalue(),
+        "menu": menu,
+        "content_digest": digest,
+        "exit_code": exit_code,
+    }
+
+
+def handle_save(daemon_state: DaemonState, digest: str) -> dict:
+    """Save the content of a served menu to its temp file, for the client.
+
+    Args:
+        daemon_state: Shared daemon state
+        digest: Content digest from the menu response
+
+    Returns:
+        Response dictionary with the path saved to as "temp_file";
+        "saved" is False if the daemon has since served other content, so
+        the client has to save it itself
+    """
+    output = StringIO()
+    temp_file = None
+    exit_code = None
+    with daemon_state.lock, redirect_stdout(output):
+        served = daemon_state.served
+        saved = served is not None and served[0] == digest
+        if saved:
+            _digest, content, menu = served
+            try:
+                temp_file = str(save_clipboard_file(content, menu, digest))
+            except SystemExit as e:
+                exit_code = e.code
+    return {
+        "version": PROTOCOL_VERSION,
+        "output": output.getvalue(),
+        "saved": saved,
+        "temp_file": temp_file,
+        "exit_code": exit_code,
+    }
+
+
+def handle_content(daemon_state: DaemonState, digest: str) -> dict:
+    """Hand the content of a served menu to the client, for a command's stdin.
+
+    Args:
+        daemon_state: Shared daemon state
+        digest: Content digest from the menu response
+
+    Returns:
+        Response dictionary with the content as "content", None if the
+        daemon has since served other content
+    """
+    with daemon_state.lock:
+        served = daemon_state.served
+        content = served[1] if served is not None and served[0] == digest else None
+    return {"version": PROTOCOL_VERSION, "content": content}
+
+
+def serve_one(server: socket.socket, token: str, daemon_state: DaemonState) -> None:
+    """Accept one connection and answer it.
+
+    A connection that does not send a valid request of this protocol
+    version is closed unanswered, so an outdated client falls back to
+    launching in process. The access token prefix is checked before the
+    request is unmarshalled, as marshal is not safe against malicious data.
+
+    Args:
+        server: Listening socket from open_endpoint
+        token: Access token from open_endpoint
+        daemon_state: Shared daemon state
+    """
+    conn, _address = server.accept()
+    with conn:
+        conn.settimeout(REQUEST_TIMEOUT)
+        try:
+            data = read_request(conn)
+            if not hmac.compare_digest(data[:TOKEN_LENGTH], encode_token(token)):
+                return
+            request = marshal.loads(data[TOKEN_LENGTH:])
+        except (OSError, EOFError, ValueError, TypeError):
+            return
+        if not isinstance(request, dict) or request.get("version") != PROTOCOL_VERSION:
+            return
+        try:
+            if "save" in request:
+                response = handle_save(daemon_state, request["save"])
+            elif "content" in request:
+                response = handle_content(daemon_state, request["content"])
+            else:
+                response = handle_request(daemon_state)
+            conn.sendall(marshal.dumps(response))
+        except Exception:
+            # The client falls back to launching in process; keep serving
+            traceback.print_exc()
+
+
+def serve(config_path: Path, watch: bool = False) -> None:
+    """Run the daemon until interrupted or terminated.
+
+    Args:
+        config_path: Path to config file
+        watch: Whether to watch the clipboard and prepare menus ahead
+
+    Raises:
+        SystemExit: If the config cannot be loaded or the endpoint cannot be created
+    """
+    # Load up front, so a broken config is reported here and the first launch is warm
+    daemon_state = DaemonState(config_path, load_config_state(config_path))
+    print(daemon_state.loaded[3], end="")
+
+    socket_path = get_socket_path(str(config_path))
+    server, token = open_endpoint(socket_path)
+    print(f"デーモンを起動しました ({socket_path})")
+
+    # Resident, so a clipboard backend that is costly to open but cheap per read pays off
+    backend = select_backend(resident=True)
+    set_backend(backend)
+    print(f"クリップボード: {backend.name}")
+
+    stop = threading.Event()
+    if watch:
+        from .watcher import watch_clipboard
+
+        watcher = threading.Thread(
+            target=watch_clipboard,
+            args=(lambda content, digest: prepare_ahead(daemon_state, content, digest), stop),
+            daemon=True,
+        )
+        watcher.start()
+        print("クリップボードの監視を開始しました")
+
+    # Terminating (e.g. on logout) stops the daemon like Ctrl+C, removing the endpoint
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        while True:
+            serve_one(server, token, daemon_state)
+    except KeyboardInterrupt:
+        print("デーモンを終了しました")
+    finally:
+        stop.set()
+        server.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
@@ -3,33 +3,58 @@
 import subprocess
 from pathlib import Path
 
+# Placeholder replaced with the path of the clipboard temp file
+CLIPBOARD_FILE_PLACEHOLDER = "{CLIPBOARD_FILE}"
 
-def replace_placeholders(text: str, temp_file_path: Path) -> str:
+
+def uses_clipboard_file(*texts: str) -> bool:
+    """Check whether a command or output file references the clipboard temp file.
+
+    Args:
+        *texts: Command and output file strings, possibly empty
+
+    Returns:
+        True if any of them contains {CLIPBOARD_FILE}
+    """
+    return any(CLIPBOARD_FILE_PLACEHOLDER in text for text in texts if text)
+
+
+def replace_placeholders(text: str, temp_file_path: Path, match_line: int | None = None) -> str:
     """Replace placeholders in text with actual values.
 
     Args:
-        text: Text containing {CLIPBOARD_FILE} placeholder
+        text: Text containing {CLIPBOARD_FILE} or {MATCH_LINE} placeholders
         temp_file_path: Path to temporary file
+        match_line: Line number (1-based) of the first match, 1 if unknown
 
     Returns:
         Text with placeholders replaced
     """
     full_path = str(temp_file_path.resolve())
-    return text.replace("{CLIPBOARD_FILE}", full_path)
+    text = text.replace(CLIPBOARD_FILE_PLACEHOLDER, full_path)
+    return text.replace("{MATCH_LINE}", str(match_line or 1))
 
 
-def execute_command(command: str, temp_file_path: Path) -> None:
+def execute_command(
+    command: str, temp_file_path: Path, match_line: int | None = None, stdin_content: str | None = None
+) -> None:
     """Execute the selected command with placeholder replacement.
 
     Args:
-        command: Command string with {CLIPBOARD_FILE} placeholder
+        command: Command string with {CLIPBOARD_FILE} or {MATCH_LINE} placeholders
         temp_file_path: Path to temporary file
+        match_line: Line number (1-based) of the first match of the selected pattern
+        stdin_content: Text piped to the command's standard input (UTF-8),
+            or None to leave it connected to the terminal
     """
     # Replace placeholder with actual temp file path
-    command_with_path = replace_placeholders(command, temp_file_path)
+    command_with_path = replace_placeholders(command, temp_file_path, match_line)
 
     try:
         # Use shell=True for Windows command execution
-        subprocess.run(command_with_path, shell=True, check=False)
+        if stdin_content is None:
+            subprocess.run(command_with_path, shell=True, check=False)
+        else:
+            subprocess.run(command_with_path, shell=True, check=False, input=stdin_content.encode("utf-8"))
     except Exception as e:
         print(f"\nエラー: コマンドの実行に失敗しました: {e}")
@@ -0,0 +1,135 @@
+"""Pattern shards included from the config and loaded behind cheap gates.
+
+A config can pull patterns from other files with
+include = ["patterns/*.toml"]. Each shard may declare a [gate] table
+before its [[patterns]]:
+
+    [gate]
+    required_literals = ["://"]  # every literal must occur in the clipboard
+    first_line_prefix = "#!"     # the clipboard must start with this
+    min_bytes = 0                # UTF-8 size bounds of the clipboard
+    max_bytes = 65536
+
+Only the part of a shard before its first [[patterns]] is read to decide
+the gate, and only shards whose gate passes are parsed and compiled.
+"""
+
+import glob
+import tomllib
+from pathlib import Path
+
+from .config import get_include_globs
+from .config_snapshot import load_pattern_file
+from .scan_scope import ContentSize
+
+# Table header that ends the gate section of a shard
+PATTERNS_HEADER = "[[patterns]]"
+
+
+def get_shard_paths(config: dict, config_path: Path) -> list:
+    """Get the pattern shard files included by a config.
+
+    Args:
+        config: Configuration dictionary
+        config_path: Path to config file (relative globs are relative to its
+            directory)
+
+    Returns:
+        List of shard paths, in include order and sorted within each glob
+
+    Raises:
+        SystemExit: If include is not a list of strings
+    """
+    shard_paths = []
+    for pattern in get_include_globs(config):
+        if Path(pattern).is_absolute():
+            # Path.glob only takes relative patterns
+            matches = [Path(match) for match in glob.glob(pattern)]
+        else:
+            matches = config_path.parent.glob(pattern)
+        for shard_path in sorted(matches):
+            if shard_path not in shard_paths:
+                shard_paths.append(shard_path)
+    return shard_paths
+
+
+def read_shard_gate(shard_path: Path) -> dict:
+    """Read the gate of a shard without reading its patterns.
+
+    Args:
+        shard_path: Path to shard file
+
+    Returns:
+        Gate dictionary (empty if the shard declares none)
+
+    Raises:
+        OSError: If the shard cannot be read
+        tomllib.TOMLDecodeError: If the gate section is invalid
+    """
+    header_lines = []
+    with open(shard_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip().startswith(PATTERNS_HEADER):
+                break
+            header_lines.append(line)
+    return tomllib.loads("".join(header_lines)).get("gate", {})
+
+
+def gate_passes(gate: dict, content: str, content_size: ContentSize) -> bool:
+    """Check whether clipboard content passes a shard gate.
+
+    Args:
+        gate: Gate dictionary from read_shard_gate
+        content: Clipboard text content
+        content_size: Size of content
+
+    Returns:
+        True if every condition of the gate holds
+    """
+    if not content_size.passes(gate.get("min_bytes"), gate.get("max_bytes")):
+        return False
+    if not content.startswith(gate.get("first_line_prefix", "")):
+        return False
+    return all(literal in content for literal in gate.get("required_literals", []))
+
+
+def load_included_patterns(config: dict, config_path: Path, content: str) -> list:
+    """Load the compiled patterns of the shards whose gate passes.
+
+    Args:
+        config: Configuration dictionary
+        config_path: Path to config file
+        content: Clipboard text content the gates are checked against
+
+    Returns:
+        List of compiled Patterns, in shard order
+    """
+    content_size = ContentSize(content)
+    patterns = []
+    for shard_path in get_shard_paths(config, config_path):
+        try:
+            gate = read_shard_gate(shard_path)
+        except (OSError, UnicodeDecodeError, tomllib.TOMLDecodeError) as e:
+            print(f"警告: パターンファイルのゲートを読み込めませんでした ({shard_path}): {e}")
+            continue
+        if gate_passes(gate, content, content_size):
+            _shard, shard_patterns = load_pattern_file(shard_path)
+            patterns.extend(shard_patterns)
+    return patterns
+
+
+def load_all_included_patterns(config: dict, config_path: Path) -> list:
+    """Load the compiled patterns of every shard, ignoring gates.
+
+    Args:
+        config: Configuration dictionary
+        config_path: Path to config file
+
+    Returns:
+        List of compiled Patterns, in shard order
+    """
+    patterns = []
+    for shard_path in get_shard_paths(config, config_path):
+        _shard, shard_patterns = load_pattern_file(shard_path)
+        patterns.extend(shard_patterns)
+    return patterns
@@ -1,15 +1,138 @@
-"""Clipboard launcher main script."""
+"""Clipboard launcher main script.
 
-import argparse
-import sys
+Modules that only some launches need (the match cache, the guarded
+matcher and multiprocessing, argparse; the executor is imported by
+menu.run_menu once a command runs) are imported where they are used,
+since the launcher is started on every hotkey press and its imports are
+part of the perceived latency. So are the loading, matching and startup
+modules, which the daemon client and --show-prefilters only partly need.
+"""
+
+import time
 from pathlib import Path
 
-from .clipboard import get_clipboard_content, save_to_temp_file, write_output_to_clipboard
-from .config import get_patterns, get_temp_file_path, load_config
-from .executor import execute_command, replace_placeholders
-from .input_handler import get_user_choice, wait_for_any_key
-from .pattern_matcher import match_patterns
-from .tui import display_no_match_tui, display_tui
+from .clipboard import get_clipboard_content, get_memory_temp_file_path, paste_clipboard, save_clipboard_file
+from .config import (
+    get_match_cache_settings,
+    get_match_timeouts,
+    get_parallel_threshold,
+    get_patterns,
+    get_scan_window_settings,
+    get_slow_pattern_history_path,
+    get_temp_file_in_memory,
+    get_temp_file_path,
+    get_temp_store_settings,
+    load_config,
+)
+from .line_index import LineIndex
+from .menu import run_menu
+from .pattern_matcher import MatchSpans
+from .tui import display_prefilter_debug, render_no_match_preview, render_preview
+
+
+def build_menu(config: dict, patterns: list, config_path: Path, content: str) -> dict:
+    """Match clipboard content and build the launch menu.
+
+    The temp file is not written: that waits until a command that uses
+    it is chosen (see menu.run_menu), and lets a menu be prepared ahead of
+    the launch it is shown in (see watcher).
+
+    Args:
+        config: Configuration dictionary
+        patterns: Compiled Patterns of the config itself
+        config_path: Path to config file
+        content: Clipboard text content
+
+    Returns:
+        Menu dictionary for menu.run_menu
+    """
+    from .includes import get_shard_paths, load_included_patterns
+    from .parallel_matcher import match_patterns_parallel
+    from .scan_scope import get_scan_window, get_tail_line_offset
+
+    # Matching and preview only look at the scan window; the command gets the full content
+    max_scan_bytes, scan_window_mode = get_scan_window_settings(config)
+    scan_content, truncated = get_scan_window(content, max_scan_bytes, scan_window_mode)
+
+    # Included pattern shards are only loaded when their gate passes for this content
+    patterns = patterns + load_included_patterns(config, config_path, scan_content)
+
+    # Match patterns, or reuse the results of an earlier launch on the same content
+    cache_dir, cache_size = get_match_cache_settings(config)
+    cache_key = None
+    if cache_size:
+        from .match_cache import get_cache_key, load_cached_matches, save_cached_matches
+
+        cache_key = get_cache_key(scan_content, config_path, get_shard_paths(config, config_path))
+    cached = load_cached_matches(cache_dir, cache_key) if cache_key else None
+
+    pattern_timeout, phase_timeout = get_match_timeouts(config)
+    if cached is not None:
+        matched_patterns = [patterns[index] for index in cached["matched"]]
+    elif pattern_timeout is None and phase_timeout is None:
+        matched_patterns = match_patterns_parallel(scan_content, patterns, get_parallel_threshold(config))
+    else:
+        from .match_guard import match_patterns_guarded
+
+        history_path = get_slow_pattern_history_path(config)
+        matched_patterns = match_patterns_guarded(scan_content, patterns, pattern_timeout, history_path, phase_timeout)
+        # Skipped patterns would be remembered as not matching
+        cache_key = None
+
+    # Warn if too many patterns matched
+    if len(matched_patterns) > 26:
+        print(f"警告: マッチしたパターンが26個を超えています ({len(matched_patterns)}個)")
+        matched_patterns = matched_patterns[:26]
+
+    # Match spans are shared by the preview and the {MATCH_LINE} placeholder
+    spans = MatchSpans(LineIndex(scan_content), matched_patterns)
+    if cached is not None:
+        preview = cached["preview"]
+    else:
+        preview = render_preview(scan_content, matched_patterns, spans) if matched_patterns else []
+        if cache_key:
+            matched_ids = {id(pattern) for pattern in matched_patterns}
+            matched_indices = [index for index, pattern in enumerate(patterns) if id(pattern) in matched_ids]
+            save_cached_matches(cache_dir, cache_key, matched_indices, preview, cache_size)
+    if not matched_patterns:
+        preview = render_no_match_preview(scan_content)
+
+    choices = []
+    tail_line_offset = None
+    for pattern_id, pattern in enumerate(matched_patterns):
+        # Only look up the match line when a placeholder asks for it
+        match_line = None
+        if "{MATCH_LINE}" in pattern.command or "{MATCH_LINE}" in (pattern.output_file or ""):
+            match_line = spans.first_match_line(pattern_id)
+        if match_line is not None and truncated and scan_window_mode == "head_tail":
+            # Lines in the tail of the window come after the omitted middle of the content
+            if tail_line_offset is None:
+                tail_line_offset = get_tail_line_offset(content, scan_content, max_scan_bytes)
+            first_tail_line, omitted_lines = tail_line_offset
+            if match_line > first_tail_line:
+                match_line += omitted_lines
+        choices.append(
+            {
+                "name": pattern.name,
+                "command": pattern.command,
+                "output_file": pattern.output_file,
+                "write_output_to_clipboard": pattern.write_output_to_clipboard,
+                "input": pattern.input,
+                "match_line": match_line,
+            }
+        )
+
+    temp_file_path = get_temp_file_path(config)
+    if get_temp_file_in_memory(config):
+        temp_file_path = get_memory_temp_file_path(temp_file_path)
+
+    return {
+        "temp_file": str(temp_file_path),
+        "temp_store": get_temp_store_settings(config),
+        "truncated": truncated,
+        "preview": preview,
+        "choices": choices,
+    }
 
 
 def main(config_path: Path) -> None:
@@ -18,68 +141,57 @@ def main(config_path: Path) -> None:
     Args:
         config_path: Path to config file (required)
     """
-    # Load configuration
-    config = load_config(config_path)
+    launch(config_path)
 
-    # Get clipboard content
-    content = get_clipboard_content()
 
-    # Save to temporary file
-    temp_file_path = get_temp_file_path(config)
-    save_to_temp_file(content, temp_file_path)
+def launch(config_path: Path, show_timings: bool = False) -> None:
+    """Run a launch, overlapping its startup phases.
 
-    # Match patterns
-    patterns = get_patterns(config)
-    matched_patterns = match_patterns(content, patterns)
+    The clipboard is read while the config loads (see startup). The temp
+    file is only written once a command that uses it is chosen.
 
-    # Check if any patterns matched
-    if not matched_patterns:
-        # Display TUI with no-match message
-        display_no_match_tui(content)
-        # Wait for user to press any key
-        wait_for_any_key()
-        print("\n終了しました")
-        sys.exit(0)
+    Args:
+        config_path: Path to config file
+        show_timings: Whether to print the time taken by each startup phase
+    """
+    from .config_snapshot import load_config_and_patterns
+    from .startup import BackgroundPhase, print_timings, run_phase
 
-    # Warn if too many patterns matched
-    if len(matched_patterns) > 26:
-        print(f"警告: マッチしたパターンが26個を超えています ({len(matched_patterns)}個)")
-        matched_patterns = matched_patterns[:26]
+    start = time.perf_counter()
+    timings = {}
 
-    # Display TUI
-    display_tui(content, matched_patterns)
+    # Read the clipboard in the background; it mostly waits on a helper process
+    clipboard = BackgroundPhase(timings, "clipboard", paste_clipboard)
 
-    # Get user choice
-    choice_index = get_user_choice(len(matched_patterns))
+    # Load configuration (from its compiled snapshot when unchanged)
+    config, patterns = run_phase(timings, "config", load_config_and_patterns, config_path)
 
-    if choice_index is None:
-        # ESC pressed, exit without doing anything
-        print("\n終了しました")
-        sys.exit(0)
+    # Get clipboard content
+    content = get_clipboard_content(clipboard.result)
 
-    # Execute selected command
-    selected_pattern = matched_patterns[choice_index]
-    command = selected_pattern.get("command", "")
+    menu = run_phase(timings, "match", build_menu, config, patterns, config_path, content)
 
-    if not command:
-        print("\nエラー: 選択されたパターンにコマンドが定義されていません")
-        sys.exit(1)
+    if show_timings:
+        print_timings(timings, time.perf_counter() - start)
 
-    print(f"\n実行中: {selected_pattern.get('name', 'unknown')}")
-    execute_command(command, temp_file_path)
+    run_menu(menu, save_temp_file=lambda: save_clipboard_file(content, menu), get_content=lambda: content)
 
-    # Handle output file if specified and write_output_to_clipboard is enabled
-    write_to_clipboard = selected_pattern.get("write_output_to_clipboard", False)
-    output_file_pattern = selected_pattern.get("output_file")
 
-    if write_to_clipboard and output_file_pattern:
-        output_file_path = Path(replace_placeholders(output_file_pattern, temp_file_path))
-        write_output_to_clipboard(output_file_path)
+def show_prefilters(config_path: Path) -> None:
+    """Show the literal prefilter of each configured pattern.
 
-    sys.exit(0)
+    Args:
+        config_path: Path to config file
+    """
+    from .includes import load_all_included_patterns
+
+    config = load_config(config_path)
+    display_prefilter_debug(get_patterns(config) + load_all_included_patterns(config, config_path))
 
 
 if __name__ == "__main__":
+    import argparse
+
     # Parse command-line arguments
     parser = argparse.ArgumentParser(description="Clipboard launcher - Launch applications based on clipboard content")
     parser.add_argument(
@@ -88,6 +200,35 @@ if __name__ == "__main__":
         required=True,
         help="Path to the TOML configuration file (required)",
     )
+    parser.add_argument(
+        "--show-prefilters",
+        action="store_true",
+        help="Show the literals each pattern is prefiltered with, then exit",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Stay resident and serve menus to the client (python -m src.client)",
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Print the time taken by each startup phase before the menu",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="With --daemon, watch the clipboard and prepare the menu before the hotkey is pressed",
+    )
     args = parser.parse_args()
+    if args.watch and not args.daemon:
+        parser.error("--watch requires --daemon")
+
+    if args.show_prefilters:
+        show_prefilters(args.config_filename)
+    elif args.daemon:
+        from .daemon import serve
 
-    main(args.config_filename)
+        serve(args.config_filename, args.watch)
+    else:
+        launch(args.config_filename, args.timings)
@@ -0,0 +1,117 @@
+"""Line offset index over clipboard content."""
+
+from bisect import bisect_right
+
+
+class LineIndex:
+    """Newline offset index over text content.
+
+    The index is a sorted array of known line start offsets with their line
+    numbers. It starts with line 0 only and records every line it resolves,
+    so a lookup costs a bisect plus a C-level str.count/str.find over the
+    gap from the nearest known line. Content below the last lookup is never
+    indexed, and lines between two lookups are never materialised.
+    """
+
+    __slots__ = ("content", "_starts", "_numbers", "_line_count")
+
+    def __init__(self, content: str) -> None:
+        self.content = content
+        self._starts = [0]
+        self._numbers = [0]
+        self._line_count = None
+
+    def _record(self, position: int, start: int, line_num: int) -> None:
+        """Record a resolved line start.
+
+        Args:
+            position: Insertion position in the index arrays
+            start: Offset where the line starts
+            line_num: Line number (0-based)
+        """
+        if self._numbers[position - 1] != line_num:
+            self._starts.insert(position, start)
+            self._numbers.insert(position, line_num)
+
+    @property
+    def line_count(self) -> int:
+        """Number of lines, as content.split("\\n") would count them."""
+        if self._line_count is None:
+            self._line_count = self.content.count("\n") + 1
+        return self._line_count
+
+    def line_of(self, offset: int) -> int:
+        """Get the line number (0-based) containing a character offset.
+
+        Args:
+            offset: Character offset into the content
+
+        Returns:
+            Line number of the offset
+        """
+        position = bisect_right(self._starts, offset)
+        base_start = self._starts[position - 1]
+        base_line = self._numbers[position - 1]
+
+        newlines = self.content.count("\n", base_start, offset)
+        if newlines:
+            line_num = base_line + newlines
+            self._record(position, self.content.rfind("\n", base_start, offset) + 1, line_num)
+            return line_num
+        return base_line
+
+    def line_start(self, line_num: int) -> int:
+        """Get the offset where a line starts.
+
+        Args:
+            line_num: Line number (0-based)
+
+        Returns:
+            Offset of the first character of the line
+
+        Raises:
+            IndexError: If the line does not exist
+        """
+        position = bisect_right(self._numbers, line_num)
+        start = self._starts[position - 1]
+        known_line = self._numbers[position - 1]
+
+        find = self.content.find
+        while known_line < line_num:
+            newline = find("\n", start)
+            if newline == -1:
+                raise IndexError(f"line {line_num} is out of range")
+            start = newline + 1
+            known_line += 1
+
+        self._record(position, start, line_num)
+        return start
+
+    def line_end(self, line_num: int) -> int:
+        """Get the offset where a line ends (its newline, or the content end).
+
+        Args:
+            line_num: Line number (0-based)
+
+        Returns:
+            Offset just past the last character of the line
+        """
+        newline = self.content.find("\n", self.line_start(line_num))
+        return len(self.content) if newline == -1 else newline
+
+    def line(self, line_num: int, max_length: int | None = None) -> str:
+        """Get the text of a line without its newline.
+
+        Args:
+            line_num: Line number (0-based)
+            max_length: Cut the line to at most this many characters, only
+                looking that far for its end (the whole line if None)
+
+        Returns:
+            Line text
+        """
+        start = self.line_start(line_num)
+        if max_length is None:
+            return self.content[start : self.line_end(line_num)]
+        newline = self.content.find("\n", start, start + max_length)
+        return self.content[start : start + max_length if newline == -1 else newline]
@@ -0,0 +1,100 @@
+"""Rendering of highlighted, width-truncated preview lines."""
+
+import unicodedata
+from functools import lru_cache
+
+from .pattern_matcher import colorize_spans
+
+# Terminal columns a preview line is truncated to
+PREVIEW_WIDTH = 80
+
+# Appended to a line that was truncated
+ELLIPSIS = "..."
+
+
+@lru_cache(maxsize=4096)
+def char_width(char: str) -> int:
+    """Get the number of terminal columns a character occupies.
+
+    Results are cached, so each distinct character is looked up in the
+    Unicode database once per process.
+
+    Args:
+        char: Single character
+
+    Returns:
+        2 for East Asian wide and fullwidth characters, 0 for combining
+        marks, 1 otherwise
+    """
+    if unicodedata.east_asian_width(char) in ("W", "F"):
+        return 2
+    if unicodedata.combining(char):
+        return 0
+    return 1
+
+
+def visible_end(text: str, max_width: int = PREVIEW_WIDTH) -> int:
+    """Get the length of the longest prefix of text that fits in max_width columns.
+
+    Only the characters up to the cut are examined.
+
+    Args:
+        text: Line text
+        max_width: Number of terminal columns available
+
+    Returns:
+        Number of characters of text that fit
+    """
+    if text[:max_width].isascii():
+        return min(len(text), max_width)
+
+    width = 0
+    for position, char in enumerate(text):
+        width += 1 if char.isascii() else char_width(char)
+        if width > max_width:
+            return position
+    return len(text)
+
+
+def visible_slice(index, line_num: int, text: str, max_width: int = PREVIEW_WIDTH) -> str:
+    """Get as much of a line as rendering it needs.
+
+    That is the visible prefix and, if the line goes on, one character
+    more. Usually the line cut to max_width + 1 characters is enough; it
+    is extended only when zero-width characters leave all of it visible.
+
+    Args:
+        index: Line index over the content
+        line_num: Line number (0-based)
+        text: The line cut to max_width + 1 characters
+        max_width: Number of terminal columns available
+
+    Returns:
+        Prefix of the line to pass to render_line
+    """
+    length = max_width + 1
+    while len(text) == length and visible_end(text, max_width) == length:
+        length *= 2
+        text = index.line(line_num, length)
+    return text
+
+
+def render_line(text: str, spans: list, max_width: int = PREVIEW_WIDTH) -> str:
+    """Render a preview line, highlighted and truncated to max_width columns.
+
+    The line is cut at the display width first, and only the visible
+    prefix is highlighted, so ANSI codes never need to be stripped to
+    measure it.
+
+    Args:
+        text: Line text
+        spans: List of (start, end) offsets of matches in text
+        max_width: Number of terminal columns available
+
+    Returns:
+        Highlighted line, followed by ELLIPSIS if it was truncated
+    """
+    end = visible_end(text, max_width)
+    visible_spans = [(start, min(stop, end)) for start, stop in spans if start < end]
+    rendered = colorize_spans(text[:end], visible_spans)
+    return rendered + ELLIPSIS if end < len(text) else rendered
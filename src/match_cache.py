@@ -0,0 +1,112 @@
+"""On-disk cache of match results, keyed by clipboard content and config."""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+# Bumped whenever the cached format or the preview rendering changes
+CACHE_VERSION = 1
+
+# Characters hashed at a time, so large content is never encoded whole
+DIGEST_CHUNK = 1 << 20
+
+
+def new_content_hash():
+    """Start a hash of UTF-8 encoded content, as content_digest computes it.
+
+    Returns:
+        hashlib hash object; its hexdigest() is the content digest
+    """
+    return hashlib.blake2b(digest_size=16)
+
+
+def content_digest(content: str) -> str:
+    """Get the digest of clipboard content.
+
+    Args:
+        content: Clipboard text content
+
+    Returns:
+        Hex digest of the UTF-8 encoded content
+    """
+    digest = new_content_hash()
+    for start in range(0, len(content), DIGEST_CHUNK):
+        digest.update(content[start : start + DIGEST_CHUNK].encode("utf-8", errors="surrogatepass"))
+    return digest.hexdigest()
+
+
+def config_digest(config_path: Path, included_paths: list = ()) -> str:
+    """Get the digest of a config file and the pattern files it includes.
+
+    Args:
+        config_path: Path to config file
+        included_paths: Paths to included pattern shard files
+
+    Returns:
+        Hex digest of the file bytes, so any edit invalidates the cache
+    """
+    digest = hashlib.blake2b(config_path.read_bytes(), digest_size=16)
+    for included_path in included_paths:
+        digest.update(str(included_path).encode("utf-8"))
+        digest.update(included_path.read_bytes())
+    return digest.hexdigest()
+
+
+def get_cache_key(content: str, config_path: Path, included_paths: list = ()) -> str:
+    """Get the cache key for a clipboard content and config file.
+
+    Args:
+        content: Clipboard text content that is matched
+        config_path: Path to config file
+        included_paths: Paths to included pattern shard files
+
+    Returns:
+        Cache key usable as a file name
+    """
+    return f"v{CACHE_VERSION}-{config_digest(config_path, included_paths)}-{content_digest(content)}"
+
+
+def load_cached_matches(cache_dir: Path, key: str) -> dict | None:
+    """Load cached match results.
+
+    A hit marks the entry as recently used.
+
+    Args:
+        cache_dir: Cache directory
+        key: Cache key from get_cache_key
+
+    Returns:
+        Dictionary with "matched" (indices into the configured patterns)
+        and "preview" (rendered preview lines), or None on a miss
+    """
+    entry_path = cache_dir / f"{key}.json"
+    try:
+        with open(entry_path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        os.utime(entry_path)
+    except (OSError, ValueError):
+        return None
+    return entry
+
+
+def save_cached_matches(cache_dir: Path, key: str, matched: list, preview: list, max_entries: int) -> None:
+    """Save match results, evicting the least recently used entries.
+
+    Args:
+        cache_dir: Cache directory
+        key: Cache key from get_cache_key
+        matched: Indices of the matched patterns in the configured patterns
+        preview: Rendered preview lines
+        max_entries: Maximum number of entries kept
+    """
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(cache_dir / f"{key}.json", "w", encoding="utf-8") as f:
+            json.dump({"matched": matched, "preview": preview}, f, ensure_ascii=False)
+
+        entries = sorted(cache_dir.glob("*.json"), key=lambda path: path.stat().st_mtime, reverse=True)
+        for stale_entry in entries[max_entries:]:
+            stale_entry.unlink(missing_ok=True)
+    except OSError as e:
+        print(f"警告: マッチ結果のキャッシュを保存できませんでした: {e}")
@@ -0,0 +1,157 @@
+"""Time-budgeted pattern matching in a killable worker process."""
+
+import json
+import multiprocessing
+import time
+from pathlib import Path
+
+from .pattern_matcher import match_patterns
+from .scan_scope import ContentSize, scope_slice
+
+# Time allowed for the worker process to start before matching begins
+WORKER_START_TIMEOUT = 10.0
+
+
+def _match_worker(conn, content: str, jobs: list) -> None:
+    """Evaluate regexes in order and report each result.
+
+    Args:
+        conn: Pipe connection to the parent process
+        content: Clipboard text content
+        jobs: List of (compiled regex, scope) tuples to evaluate
+    """
+    slices = {}
+    conn.send("ready")
+    for regex, scope in jobs:
+        if scope not in slices:
+            slices[scope] = scope_slice(content, scope)
+        conn.send(regex.search(slices[scope]) is not None)
+    conn.close()
+
+
+def load_slow_history(history_path: Path) -> dict:
+    """Load the history of patterns that exceeded their time budget.
+
+    Args:
+        history_path: Path to history JSON file
+
+    Returns:
+        Dictionary keyed by regex with name and timeout count
+    """
+    try:
+        with open(history_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_slow_history(history_path: Path, history: dict) -> None:
+    """Save the history of patterns that exceeded their time budget.
+
+    Args:
+        history_path: Path to history JSON file
+        history: Dictionary keyed by regex with name and timeout count
+    """
+    try:
+        history_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(history_path, "w", encoding="utf-8") as f:
+            json.dump(history, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        print(f"警告: 低速パターンの履歴を保存できませんでした: {e}")
+
+
+def match_patterns_guarded(
+    content: str,
+    patterns: list,
+    pattern_timeout: float | None,
+    history_path: Path,
+    phase_timeout: float | None = None,
+) -> list:
+    """Match clipboard content against patterns with a wall-clock budget.
+
+    Patterns are evaluated one by one in a worker process. A pattern that
+    does not finish within pattern_timeout is skipped and reported, the
+    worker is killed and a new one continues with the next pattern.
+    Patterns recorded as slow in earlier launches are evaluated last. If
+    a worker fails to start, the remaining patterns are matched in process
+    without a budget, and no pattern is blamed for it.
+
+    Args:
+        content: Clipboard text content
+        patterns: List of compiled Patterns from config.get_patterns
+        pattern_timeout: Budget per pattern in seconds (optional)
+        history_path: Path to slow pattern history JSON file
+        phase_timeout: Budget for the whole match phase in seconds (optional)
+
+    Returns:
+        List of matched Patterns, in config order
+    """
+    history = load_slow_history(history_path)
+    content_size = ContentSize(content)
+    candidates = [
+        index for index, pattern in enumerate(patterns) if content_size.passes(pattern.min_bytes, pattern.max_bytes)
+    ]
+    pending = sorted(candidates, key=lambda index: patterns[index].regex in history)
+    deadline = None if phase_timeout is None else time.monotonic() + phase_timeout
+    matched_indices = set()
+    history_changed = False
+
+    while pending:
+        parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
+        jobs = [(patterns[index].compiled, patterns[index].scope) for index in pending]
+        worker = multiprocessing.Process(target=_match_worker, args=(child_conn, content, jobs), daemon=True)
+        worker.start()
+        child_conn.close()
+
+        position = 0
+        started = False
+        try:
+            if parent_conn.poll(WORKER_START_TIMEOUT):
+                parent_conn.recv()
+                started = True
+                while position < len(pending):
+                    timeout = pattern_timeout
+                    if deadline is not None:
+                        remaining_time = max(0.0, deadline - time.monotonic())
+                        timeout = remaining_time if timeout is None else min(timeout, remaining_time)
+                    if not parent_conn.poll(timeout):
+                        break
+                    if parent_conn.recv():
+                        matched_indices.add(pending[position])
+                    position += 1
+        except EOFError:
+            # Worker died, while evaluating the current pattern if it started
+            pass
+        finally:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+            parent_conn.close()
+
+        if position == len(pending):
+            break
+
+        if not started:
+            print("警告: マッチング用のプロセスを起動できなかったため、制限時間なしでマッチングします")
+            remaining = [patterns[index] for index in pending]
+            matched_ids = {id(pattern) for pattern in match_patterns(content, remaining)}
+            matched_indices.update(index for index in pending if id(patterns[index]) in matched_ids)
+            break
+
+        # Without a per-pattern budget only the phase budget can run out
+        if deadline is not None and (pattern_timeout is None or time.monotonic() >= deadline):
+            names = ", ".join(patterns[index].name for index in pending[position:])
+            print(f"警告: マッチングの制限時間を超えたため、残りのパターンをスキップしました ({names})")
+            break
+
+        slow_pattern = patterns[pending[position]]
+        print(f"警告: 制限時間内に評価できなかったパターンをスキップしました ({slow_pattern.name})")
+        entry = history.setdefault(slow_pattern.regex, {"name": slow_pattern.name, "timeouts": 0})
+        entry["timeouts"] += 1
+        history_changed = True
+        pending = pending[position + 1 :]
+
+    if history_changed:
+        save_slow_history(history_path, history)
+
+    return [pattern for index, pattern in enumerate(patterns) if index in matched_indices]
@@ -0,0 +1,142 @@
+"""Launch menu display and the action taken on the user's choice.
+
+A menu is a plain dictionary of strings, numbers and lists, so it can be
+built in process by launcher.build_menu or received from the daemon:
+
+    {
+        "temp_file": path of the clipboard temp file, written once a
+                     command that uses it is chosen,
+        "temp_store": content-addressed store settings ({"dir",
+                      "max_bytes", "max_age"}) used instead, or None,
+        "truncated": whether matching only saw part of the clipboard,
+        "preview": rendered preview lines,
+        "choices": [{"name", "command", "output_file",
+                     "write_output_to_clipboard", "input", "match_line"}, ...],
+    }
+
+This module is imported by the thin daemon client, so it must stay cheap
+to import: no regex, TOML or clipboard modules at module level.
+"""
+
+import sys
+
+from .input_handler import get_user_choice, wait_for_any_key
+
+# ANSI color codes
+COLOR_RESET = "\033[0m"
+COLOR_WHITE = "\033[97m"  # Bright white for headers and prompts
+COLOR_BRIGHT_RED = "\033[91m"  # Bright red for pattern options
+GRAY = "\033[90m"
+RESET = "\033[0m"
+
+# Shown when matching and preview only saw part of the clipboard
+TRUNCATED_NOTICE = "(クリップボードが大きいため、マッチングとプレビューは一部のみを対象にしています)"
+
+
+def print_preview(preview: list, truncated: bool) -> None:
+    """Print the clipboard preview section.
+
+    Args:
+        preview: Rendered preview lines
+        truncated: Whether the preview is of a truncated scan window
+    """
+    print(f"{GRAY}クリップボード内容:{RESET}")
+    print(f"{GRAY}{'-' * 40}{RESET}")
+    for line in preview:
+        print(line)
+    print(f"{GRAY}{'-' * 40}{RESET}")
+    if truncated:
+        print(f"{GRAY}{TRUNCATED_NOTICE}{RESET}")
+    print()
+
+
+def print_choices(names: list) -> None:
+    """Print the matched pattern names and the selection prompt.
+
+    Args:
+        names: Names of the matched patterns, in menu order
+    """
+    print(f"{GRAY}マッチしたパターン:{RESET}")
+    for i, name in enumerate(names):
+        letter = chr(ord("a") + i)
+        print(f"{COLOR_BRIGHT_RED}{letter}: {name}{COLOR_RESET}")
+
+    print()
+
+    # Show prompt
+    last_letter = chr(ord("a") + len(names) - 1)
+    print(f"{COLOR_WHITE}選択してください (a-{last_letter}, ESC: 終了): {COLOR_RESET}", end="", flush=True)
+
+
+def print_no_match() -> None:
+    """Print the no-match message and the exit prompt."""
+    print(f"{GRAY}マッチする候補がありませんでした{RESET}")
+    print()
+    print(f"{COLOR_WHITE}任意のキーを押して終了: {COLOR_RESET}", end="", flush=True)
+
+
+def run_menu(menu: dict, save_temp_file=None, get_content=None) -> None:
+    """Display a menu, wait for the user's choice and run its command.
+
+    Args:
+        menu: Menu dictionary (see module docstring)
+        save_temp_file: Called to write the temp file before a command
+            whose command or output file references {CLIPBOARD_FILE};
+            returns the path it was written to
+        get_content: Called to get the clipboard content for a command
+            whose input is "stdin"
+
+    Raises:
+        SystemExit: Always, once the launch is finished
+    """
+    print_preview(menu["preview"], menu["truncated"])
+    choices = menu["choices"]
+
+    if not choices:
+        print_no_match()
+        # Wait for user to press any key
+        wait_for_any_key()
+        print("\n終了しました")
+        sys.exit(0)
+
+    print_choices([choice["name"] for choice in choices])
+
+    # Get user choice
+    choice_index = get_user_choice(len(choices))
+
+    if choice_index is None:
+        # ESC pressed, exit without doing anything
+        print("\n終了しました")
+        sys.exit(0)
+
+    # Execute selected command
+    choice = choices[choice_index]
+    command = choice["command"]
+
+    if not command:
+        print("\nエラー: 選択されたパターンにコマンドが定義されていません")
+        sys.exit(1)
+
+    # Only needed once a command runs, so kept off the path to the menu
+    from pathlib import Path
+
+    from .clipboard import write_output_to_clipboard
+    from .executor import execute_command, replace_placeholders, uses_clipboard_file
+
+    # The clipboard only goes to disk when the chosen command reads it
+    temp_file_path = Path(menu["temp_file"])
+    if save_temp_file is not None and uses_clipboard_file(command, choice["output_file"]):
+        temp_file_path = Path(save_temp_file())
+    stdin_content = None
+    if choice["input"] == "stdin" and get_content is not None:
+        stdin_content = get_content()
+    print(f"\n実行中: {choice['name']}")
+    execute_command(command, temp_file_path, choice["match_line"], stdin_content)
+
+    # Handle output file if specified and write_output_to_clipboard is enabled
+    output_file_pattern = choice["output_file"]
+    if choice["write_output_to_clipboard"] and output_file_pattern:
+        output_file_path = Path(replace_placeholders(output_file_pattern, temp_file_path, choice["match_line"]))
+        write_output_to_clipboard(output_file_path)
+
+    sys.exit(0)
@@ -0,0 +1,89 @@
+"""Pattern matching sharded across a process pool."""
+
+import os
+
+from .pattern_matcher import match_patterns, prepare_scan_jobs, scan_jobs
+
+# Work (patterns x content characters) above which matching runs in parallel.
+# The serial scan does roughly 3e8 of these per second, so below this the
+# pool start-up (about 0.1-0.3 s when workers are spawned) does not pay off.
+DEFAULT_PARALLEL_THRESHOLD = 100_000_000
+
+# Content shared by every task of a worker, set once by the pool initializer
+_worker_content = None
+
+
+def _init_worker(content: str) -> None:
+    """Store the content in the worker so tasks only carry patterns.
+
+    Args:
+        content: Clipboard text content
+    """
+    global _worker_content
+    _worker_content = content
+
+
+def _scan_shard(jobs: list) -> set:
+    """Scan the worker's content for a shard of jobs.
+
+    Args:
+        jobs: List of scan jobs from pattern_matcher.prepare_scan_jobs
+
+    Returns:
+        Set of pattern indices that matched
+    """
+    return scan_jobs(_worker_content, jobs)
+
+
+def get_worker_count() -> int:
+    """Get the number of cores this process may run on.
+
+    Returns:
+        Number of usable cores (at least 1)
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+def match_patterns_parallel(
+    content: str,
+    patterns: list,
+    threshold: int = DEFAULT_PARALLEL_THRESHOLD,
+    workers: int | None = None,
+) -> list:
+    """Match clipboard content against patterns, in parallel when it pays off.
+
+    When the estimated work (number of patterns times content length) is at
+    least threshold and more than one core is available, the patterns are
+    dealt round-robin into one shard per worker, so clusters of expensive
+    patterns are spread out, and the shards are scanned in a process pool.
+    Otherwise this is match_patterns.
+
+    Args:
+        content: Clipboard text content
+        patterns: List of compiled Patterns from config
+        threshold: Work estimate from which matching runs in parallel
+        workers: Number of worker processes (usable cores if None)
+
+    Returns:
+        List of matched Patterns, in config order
+    """
+    if workers is None:
+        workers = get_worker_count()
+    workers = min(workers, len(patterns))
+    if workers <= 1 or len(patterns) * len(content) < threshold:
+        return match_patterns(content, patterns)
+
+    # Imported here, as it pulls in multiprocessing, which most launches never need
+    from concurrent.futures import ProcessPoolExecutor
+
+    valid_patterns, jobs = prepare_scan_jobs(content, patterns)
+    shards = [jobs[shard::workers] for shard in range(workers)]
+
+    matched_indices = set()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(content,)) as pool:
+        for hits in pool.map(_scan_shard, shards):
+            matched_indices.update(hits)
+
+    return [pattern for index, pattern in enumerate(valid_patterns) if index in matched_indices]
@@ -0,0 +1,63 @@
+"""Typed pattern record."""
+
+from collections import namedtuple
+
+from .regex_analysis import ANALYSIS_FIELDS
+
+PATTERN_FIELDS = (
+    "name",
+    "regex",
+    "compiled",
+    "flags",
+    "command",
+    "output_file",
+    "write_output_to_clipboard",
+    "input",
+    "scope",
+    "min_bytes",
+    "max_bytes",
+    *ANALYSIS_FIELDS,
+)
+
+
+class Pattern(namedtuple("Pattern", PATTERN_FIELDS)):
+    """A pattern from config, validated and with defaults resolved.
+
+    Built once by config.compile_pattern; matchers, the TUI and the
+    launcher read its fields directly. A named tuple rather than a frozen
+    dataclass, as importing dataclasses (and inspect with it) would cost
+    every launch several milliseconds; instances are just as immutable and
+    carry no per-instance dictionary.
+
+    Attributes:
+        name: Display name
+        regex: Regex source as written in config
+        compiled: Compiled regex (re.Pattern)
+        flags: Regex flags the regex was compiled with
+        command: Command template to execute ("" if none)
+        output_file: Output file path template, or None
+        write_output_to_clipboard: Whether the output file is written back to the clipboard
+        input: How the command gets the clipboard besides placeholders:
+            "stdin" to have it piped to its standard input, else "file"
+        scope: Parsed scan scope (see scan_scope.parse_scope)
+        min_bytes: Minimum clipboard size in UTF-8 bytes, or None
+        max_bytes: Maximum clipboard size in UTF-8 bytes, or None
+        literal_prefix: Literal text every match starts with
+        required_literals: Literals every match contains
+        line_local: Whether every match stays within one line
+        anchor: Anchor class of the regex
+        max_width: Longest possible match, None if unbounded
+        max_reach: Characters past its start a match attempt can examine,
+            None if unbounded
+    """
+
+    __slots__ = ()
+
+    @property
+    def analysis(self) -> dict:
+        """Get the regex analysis in the form the scan engine takes.
+
+        Returns:
+            Dictionary of the analysis fields (see regex_analysis.analyze_regex)
+        """
+        return {field: getattr(self, field) for field in ANALYSIS_FIELDS}
@@ -1,92 +1,381 @@
 """Pattern matching operations."""
 
+import heapq
 import re
+from bisect import bisect_left
+from itertools import islice
 
+from .line_index import LineIndex
+from .scan_engine import anchored_finditer, anchored_search, has_literals, scan_matched_indices
+from .scan_scope import ContentSize, scope_slice
 
-def match_patterns(content: str, patterns: list) -> list:
-    """Match clipboard content against regex patterns.
+
+def prepare_scan_jobs(content: str, patterns: list) -> tuple[list, list]:
+    """Resolve patterns into scan jobs for match_patterns.
+
+    Patterns whose size gate (min_bytes/max_bytes) rejects the content
+    are left out.
 
     Args:
         content: Clipboard text content
-        patterns: List of pattern dictionaries from config
+        patterns: List of compiled Patterns from config
 
     Returns:
-        List of matched pattern dictionaries
+        Tuple of (patterns that take part, list of (index into those
+        patterns, compiled regex, analysis, scope) jobs)
     """
-    matched = []
+    content_size = ContentSize(content)
+    valid_patterns = []
+    jobs = []
 
     for pattern in patterns:
-        try:
-            regex = pattern.get("regex", "")
-            if re.search(regex, content):
-                matched.append(pattern)
-        except re.error as e:
-            print(f"警告: 無効な正規表現をスキップしました ({pattern.get('name', 'unknown')}): {e}")
+        if not content_size.passes(pattern.min_bytes, pattern.max_bytes):
             continue
+        jobs.append((len(valid_patterns), pattern.compiled, pattern.analysis, pattern.scope))
+        valid_patterns.append(pattern)
 
-    return matched
+    return valid_patterns, jobs
 
 
-def get_matched_line_numbers(content: str, patterns: list) -> list:
-    """Get line numbers where patterns match.
+def scan_jobs(content: str, jobs: list) -> set:
+    """Scan content for a list of jobs from prepare_scan_jobs.
+
+    Jobs are grouped by scope, and the slice of content each scope declares
+    is scanned once for its whole group by the scan engine.
 
     Args:
         content: Clipboard text content
-        patterns: List of pattern dictionaries with regex fields
+        jobs: List of scan jobs
 
     Returns:
-        Sorted list of unique line numbers (0-based) where matches occur
+        Set of pattern indices that matched
     """
-    lines = content.split("\n")
-    matched_line_numbers = set()
+    groups = {}
+    for job in jobs:
+        groups.setdefault(job[3], []).append(job)
 
-    for pattern in patterns:
-        try:
-            regex = pattern.get("regex", "")
-            for line_num, line in enumerate(lines):
-                if re.search(regex, line):
-                    matched_line_numbers.add(line_num)
-        except re.error:
-            # Skip invalid regex patterns
-            continue
+    matched_indices = set()
+    for scope, members in groups.items():
+        indices, regexes, analyses, _scopes = zip(*members)
+        hits = scan_matched_indices(scope_slice(content, scope), list(regexes), list(analyses))
+        matched_indices.update(indices[hit] for hit in hits)
+    return matched_indices
 
-    return sorted(matched_line_numbers)
 
+def match_patterns(content: str, patterns: list) -> list:
+    """Match clipboard content against regex patterns.
 
-def colorize_matched_text(text: str, patterns: list) -> str:
-    """Colorize text based on regex pattern matches.
+    Patterns whose size gate (min_bytes/max_bytes) rejects the content are
+    skipped. The rest are grouped by scope, and the slice of content each
+    scope declares is scanned once for its whole group by the scan engine.
+
+    Args:
+        content: Clipboard text content
+        patterns: List of compiled Patterns from config
+
+    Returns:
+        List of matched Patterns, in config order
+    """
+    valid_patterns, jobs = prepare_scan_jobs(content, patterns)
+    matched_indices = scan_jobs(content, jobs)
+    return [pattern for index, pattern in enumerate(valid_patterns) if index in matched_indices]
+
+
+class _PatternScan:
+    """Per-line search state of one pattern within MatchSpans.
+
+    Lines are searched in order. The offset of the first match on each
+    matched line is recorded, so highlighting that line later resumes there
+    instead of searching the line again.
+    """
+
+    __slots__ = ("pattern_id", "regex", "line_regex", "analysis", "hit_lines", "hit_offsets", "searched_to")
+
+    def __init__(self, pattern_id: int, regex: re.Pattern, analysis: dict) -> None:
+        self.pattern_id = pattern_id
+        self.regex = regex
+        # Line-local regexes search the whole content with MULTILINE, which
+        # finds exactly the matches of a per-line search
+        self.line_regex = re.compile(regex.pattern, regex.flags | re.MULTILINE) if analysis["line_local"] else None
+        self.analysis = analysis
+        self.hit_lines = []
+        self.hit_offsets = []
+        # Every line before this one has been searched
+        self.searched_to = 0
+
+    def _search(self, index: LineIndex, line_num: int) -> int | None:
+        """Find the first match on or after a line.
+
+        Args:
+            index: Line index over the content
+            line_num: Line number (0-based) to start at
+
+        Returns:
+            Offset where the match starts, or None
+        """
+        if self.line_regex is not None:
+            match = self.line_regex.search(index.content, index.line_start(line_num))
+            return None if match is None else match.start()
+
+        # Walk the lines directly; only the matched line is recorded in the index
+        content = index.content
+        literals = self.analysis["required_literals"]
+        line_start = index.line_start(line_num)
+        while True:
+            line_end = content.find("\n", line_start)
+            if line_end == -1:
+                line_end = len(content)
+            line = content[line_start:line_end]
+            if has_literals(line, literals):
+                match = anchored_search(self.regex, line, self.analysis)
+                if match is not None:
+                    return line_start + match.start()
+            if line_end == len(content):
+                return None
+            line_start = line_end + 1
+
+    def next_hit(self, index: LineIndex, line_num: int) -> int | None:
+        """Get the first line on or after line_num where the pattern matches.
+
+        Args:
+            index: Line index over the content
+            line_num: Line number (0-based)
+
+        Returns:
+            Matched line number, or None if no later line matches
+        """
+        position = bisect_left(self.hit_lines, line_num)
+        if position < len(self.hit_lines):
+            return self.hit_lines[position]
+
+        while self.searched_to < index.line_count:
+            offset = self._search(index, self.searched_to)
+            if offset is None:
+                self.searched_to = index.line_count
+                return None
+            hit_line = index.line_of(offset)
+            self.hit_lines.append(hit_line)
+            self.hit_offsets.append(offset)
+            self.searched_to = hit_line + 1
+            if hit_line >= line_num:
+                return hit_line
+        return None
+
+    def iter_line_spans(self, index: LineIndex, line_num: int, stop: int | None = None):
+        """Lazily yield the spans of the pattern on a line.
+
+        Args:
+            index: Line index over the content
+            line_num: Line number (0-based)
+            stop: Offset only the spans starting before which are wanted;
+                when the regex's reach is bounded, no text further than
+                it needs to find those is examined (the whole line if None)
+
+        Yields:
+            (start, end) offsets into the content, in ascending order
+        """
+        line_start = index.line_start(line_num)
+        line_end = index.line_end(line_num)
+        max_reach = self.analysis["max_reach"]
+        if stop is not None and max_reach is not None:
+            # A match starting before stop lies, with what it looks at, within max_reach of it
+            line_end = min(line_end, stop + max_reach)
+        start = line_start
+        if line_num < self.searched_to:
+            position = bisect_left(self.hit_lines, line_num)
+            if position == len(self.hit_lines) or self.hit_lines[position] != line_num:
+                # Searched before and known not to match
+                return
+            start = self.hit_offsets[position]
+
+        if self.line_regex is not None:
+            # The line end is the string end for the regex, as in a per-line search;
+            # a cut before it is never reached by a match starting before stop
+            for match in self.line_regex.finditer(index.content, start, line_end):
+                yield match.start(), match.end()
+            return
+
+        line = index.content[line_start:line_end]
+        if has_literals(line, self.analysis["required_literals"]):
+            for match in anchored_finditer(self.regex, line, self.analysis):
+                yield line_start + match.start(), line_start + match.end()
+
+
+class MatchSpans:
+    """Spans where patterns match content, shared by every consumer.
+
+    Matches are defined line by line, as if each line were searched on its
+    own. Line selection searches each pattern for its next matched line
+    only, and records where the first match on that line starts.
+    Highlighting a line then resumes from that offset and stops at the line
+    end or at the visible limit, so no regex examines the same text twice.
+    Collected spans are kept in three parallel arrays (pattern index, start,
+    end), grouped by line.
+    """
+
+    __slots__ = ("index", "patterns", "pattern_ids", "starts", "ends", "_scans", "_line_ranges")
+
+    def __init__(self, index: LineIndex, patterns: list) -> None:
+        self.index = index
+        self.patterns = patterns
+        self.pattern_ids = []
+        self.starts = []
+        self.ends = []
+        # Line number -> (first, last) positions in the arrays and the offset collection stopped at
+        self._line_ranges = {}
+
+        self._scans = {}
+        for pattern_id, pattern in enumerate(patterns):
+            # Prefilter: content lacking a required literal cannot match
+            if has_literals(index.content, pattern.required_literals):
+                self._scans[pattern_id] = _PatternScan(pattern_id, pattern.compiled, pattern.analysis)
+
+    def iter_line_numbers(self):
+        """Lazily yield the lines where any pattern matches.
+
+        Yields:
+            Unique line numbers (0-based) in ascending order
+        """
+        heads = []
+        for scan in self._scans.values():
+            line_num = scan.next_hit(self.index, 0)
+            if line_num is not None:
+                heads.append((line_num, scan.pattern_id))
+        heapq.heapify(heads)
+
+        last_line_num = -1
+        while heads:
+            line_num, pattern_id = heads[0]
+            if line_num != last_line_num:
+                yield line_num
+                last_line_num = line_num
+            next_line_num = self._scans[pattern_id].next_hit(self.index, line_num + 1)
+            if next_line_num is None:
+                heapq.heappop(heads)
+            else:
+                heapq.heapreplace(heads, (next_line_num, pattern_id))
+
+    def line_spans(self, line_num: int, limit: int | None = None) -> list:
+        """Get the spans on a line.
+
+        Args:
+            line_num: Line number (0-based)
+            limit: Only collect spans starting within this many characters
+                of the line start (the whole line if None)
+
+        Returns:
+            List of (start, end) offsets relative to the line start, in
+            ascending order of start
+        """
+        line_start = self.index.line_start(line_num)
+        # An empty match at the line end belongs to this line
+        stop = self.index.line_end(line_num) + 1
+        if limit is not None:
+            stop = min(stop, line_start + limit)
+
+        cached = self._line_ranges.get(line_num)
+        if cached is None or cached[2] < stop:
+            spans = []
+            for scan in self._scans.values():
+                for start, end in scan.iter_line_spans(self.index, line_num, stop):
+                    if start >= stop:
+                        break
+                    spans.append((start, end, scan.pattern_id))
+            spans.sort()
+
+            first = len(self.starts)
+            for start, end, pattern_id in spans:
+                self.pattern_ids.append(pattern_id)
+                self.starts.append(start)
+                self.ends.append(end)
+            cached = (first, len(self.starts), stop)
+            self._line_ranges[line_num] = cached
+
+        first, last, _stop = cached
+        return [
+            (self.starts[i] - line_start, self.ends[i] - line_start)
+            for i in range(first, last)
+            if self.starts[i] < stop
+        ]
+
+    def first_match_line(self, pattern_id: int) -> int | None:
+        """Get the line (1-based) of the first match of a pattern within its scope.
+
+        Args:
+            pattern_id: Index of the pattern in patterns
+
+        Returns:
+            Line number as editors count lines, or None if the pattern
+            matches no single line within its scope
+        """
+        scan = self._scans.get(pattern_id)
+        if scan is None:
+            return None
+
+        # Only lines within the pattern's scope count
+        first_line, end_line = 0, self.index.line_count
+        kind, lines = self.patterns[pattern_id].scope
+        if kind == "head":
+            end_line = lines
+        elif kind == "tail":
+            content = self.index.content
+            first_line = self.index.line_of(len(content) - len(scope_slice(content, (kind, lines))))
+
+        line_num = scan.next_hit(self.index, first_line)
+        return None if line_num is None or line_num >= end_line else line_num + 1
+
+
+def iter_matched_line_numbers(content: str, patterns: list, index: LineIndex | None = None):
+    """Lazily yield line numbers where patterns match.
+
+    Args:
+        content: Clipboard text content
+        patterns: List of compiled Patterns
+        index: Line index over content (built if not given)
+
+    Yields:
+        Unique line numbers (0-based) in ascending order
+    """
+    if index is None:
+        index = LineIndex(content)
+    yield from MatchSpans(index, patterns).iter_line_numbers()
+
+
+def get_matched_line_numbers(content: str, patterns: list, index: LineIndex | None = None) -> list:
+    """Get line numbers where patterns match.
+
+    Args:
+        content: Clipboard text content
+        patterns: List of compiled Patterns
+        index: Line index over content (built if not given)
+
+    Returns:
+        Sorted list of unique line numbers (0-based) where matches occur
+    """
+    return list(iter_matched_line_numbers(content, patterns, index))
+
+
+def colorize_spans(text: str, spans: list) -> str:
+    """Colorize the spans of text.
 
     Args:
         text: Text to colorize
-        patterns: List of pattern dictionaries with regex fields
+        spans: List of (start, end) offsets into text
 
     Returns:
-        Text with ANSI color codes for matched portions
+        Text with ANSI color codes for the spans, overlapping or adjacent
+        spans merged
     """
     # ANSI color codes
     COLOR_HIGHLIGHT = "\033[93m"  # Yellow for highlighting matches
     COLOR_RESET = "\033[0m"  # Reset to default color
 
-    # Collect all match positions from all patterns
-    matches = []
-    for pattern in patterns:
-        try:
-            regex = pattern.get("regex", "")
-            for match in re.finditer(regex, text):
-                matches.append((match.start(), match.end()))
-        except re.error:
-            # Skip invalid regex patterns
-            continue
-
-    if not matches:
+    if not spans:
         return text
 
-    # Sort matches by start position
-    matches.sort()
-
     # Merge overlapping matches
     merged_matches = []
-    for start, end in matches:
+    for start, end in sorted(spans):
         if merged_matches and start <= merged_matches[-1][1]:
             # Overlapping or adjacent, merge them
             merged_matches[-1] = (merged_matches[-1][0], max(merged_matches[-1][1], end))
@@ -110,23 +399,60 @@ def colorize_matched_text(text: str, patterns: list) -> str:
     return "".join(result)
 
 
-def get_display_lines(content: str, matched_patterns: list) -> list:
+def colorize_matched_text(text: str, patterns: list) -> str:
+    """Colorize text based on regex pattern matches.
+
+    Args:
+        text: Text to colorize
+        patterns: List of compiled Patterns
+
+    Returns:
+        Text with ANSI color codes for matched portions
+    """
+    # Collect all match positions from all patterns
+    matches = []
+    for pattern in patterns:
+        # Prefilter: text lacking a required literal cannot match
+        if not has_literals(text, pattern.required_literals):
+            continue
+        for match in anchored_finditer(pattern.compiled, text, pattern.analysis):
+            matches.append((match.start(), match.end()))
+
+    return colorize_spans(text, matches)
+
+
+def get_display_lines(
+    content: str,
+    matched_patterns: list,
+    index: LineIndex | None = None,
+    spans: MatchSpans | None = None,
+    max_length: int | None = None,
+) -> list:
     """Get lines to display based on matched patterns.
 
+    At most three matched lines decide the layout, so matching stops after
+    the third matched line and only the displayed lines are extracted.
+
     Args:
         content: Clipboard text content
-        matched_patterns: List of matched pattern dictionaries
+        matched_patterns: List of matched Patterns
+        index: Line index over content (built if not given)
+        spans: Match spans of matched_patterns over index (built if not given)
+        max_length: Cut lines to at most this many characters (whole lines
+            if None), for a preview that only shows their beginning
 
     Returns:
         List of tuples (line_content, line_number) to display, max 3 lines
     """
-    lines = content.split("\n")
-    total_lines = len(lines)
-    matched_line_numbers = get_matched_line_numbers(content, matched_patterns)
+    if spans is None:
+        spans = MatchSpans(index if index is not None else LineIndex(content), matched_patterns)
+    index = spans.index
+    total_lines = index.line_count
+    matched_line_numbers = list(islice(spans.iter_line_numbers(), 3))
 
     if not matched_line_numbers:
         # Fallback to first 3 lines if no lines match
-        return [(lines[i], i) for i in range(min(3, total_lines))]
+        return [(index.line(i, max_length), i) for i in range(min(3, total_lines))]
 
     display_lines = []
     num_matches = len(matched_line_numbers)
@@ -137,16 +463,16 @@ def get_display_lines(content: str, matched_patterns: list) -> list:
 
         # Add line before if exists
         if match_line > 0:
-            display_lines.append((lines[match_line - 1], match_line - 1))
+            display_lines.append((index.line(match_line - 1, max_length), match_line - 1))
         else:
             display_lines.append(("(file先頭)", -1))
 
         # Add matched line
-        display_lines.append((lines[match_line], match_line))
+        display_lines.append((index.line(match_line, max_length), match_line))
 
         # Add line after if exists
         if match_line < total_lines - 1:
-            display_lines.append((lines[match_line + 1], match_line + 1))
+            display_lines.append((index.line(match_line + 1, max_length), match_line + 1))
         else:
             display_lines.append(("(file終端)", -1))
 
@@ -157,20 +483,19 @@ def get_display_lines(content: str, matched_patterns: list) -> list:
 
         # Add line before first match if exists
         if first_match > 0:
-            display_lines.append((lines[first_match - 1], first_match - 1))
+            display_lines.append((index.line(first_match - 1, max_length), first_match - 1))
         else:
             display_lines.append(("(file先頭)", -1))
 
         # Add first matched line
-        display_lines.append((lines[first_match], first_match))
+        display_lines.append((index.line(first_match, max_length), first_match))
 
         # Add second matched line
-        display_lines.append((lines[second_match], second_match))
+        display_lines.append((index.line(second_match, max_length), second_match))
 
     else:
         # 3+ matches: Show first 3 matched lines
-        for i in range(min(3, num_matches)):
-            line_num = matched_line_numbers[i]
-            display_lines.append((lines[line_num], line_num))
+        for line_num in matched_line_numbers:
+            display_lines.append((index.line(line_num, max_length), line_num))
 
     return display_lines
@@ -0,0 +1,357 @@
+"""Static analysis of pattern regexes."""
+
+import re
+from re import _constants as sre_constants
+from re import _parser as sre_parser
+
+
+def parse_regex(regex: re.Pattern) -> sre_parser.SubPattern:
+    """Parse a compiled regex into its syntax tree.
+
+    Args:
+        regex: Compiled regex
+
+    Returns:
+        Parsed syntax tree from the re module's parser
+    """
+    return sre_parser.parse(regex.pattern, regex.flags)
+
+
+def _literal_run(parsed: sre_parser.SubPattern) -> tuple[str, bool]:
+    """Collect the literal characters a parsed sequence starts with.
+
+    Args:
+        parsed: Parsed regex sequence
+
+    Returns:
+        Tuple of (literal text, whether the whole sequence was literal)
+    """
+    chars = []
+    for op, av in parsed:
+        if op is sre_constants.LITERAL:
+            chars.append(chr(av))
+        elif op is sre_constants.SUBPATTERN:
+            _group, add_flags, _del_flags, sub_pattern = av
+            if add_flags & re.IGNORECASE:
+                return "".join(chars), False
+            sub_chars, complete = _literal_run(sub_pattern)
+            chars.append(sub_chars)
+            if not complete:
+                return "".join(chars), False
+        else:
+            return "".join(chars), False
+    return "".join(chars), True
+
+
+# Character categories that include the newline character
+_NEWLINE_CATEGORIES = {
+    sre_constants.CATEGORY_SPACE,
+    sre_constants.CATEGORY_NOT_DIGIT,
+    sre_constants.CATEGORY_NOT_WORD,
+    sre_constants.CATEGORY_LINEBREAK,
+}
+
+# Anchors that keep their meaning when the content is scanned line by line.
+# \B is not one of them: it matches between the newlines around an empty
+# line, but not in the empty string that line is on its own
+_LINE_ANCHORS = {
+    sre_constants.AT_BEGINNING,
+    sre_constants.AT_BEGINNING_LINE,
+    sre_constants.AT_END,
+    sre_constants.AT_END_LINE,
+    sre_constants.AT_BOUNDARY,
+}
+
+_REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT, sre_constants.POSSESSIVE_REPEAT}
+
+
+def _set_has_newline(items: list) -> bool:
+    """Check whether a parsed character set contains the newline character.
+
+    Args:
+        items: Items of a parsed IN node
+
+    Returns:
+        True if the set matches "\\n"
+    """
+    negate = False
+    contains = False
+    for op, av in items:
+        if op is sre_constants.NEGATE:
+            negate = True
+        elif op is sre_constants.LITERAL:
+            contains = contains or av == 10
+        elif op is sre_constants.RANGE:
+            contains = contains or av[0] <= 10 <= av[1]
+        elif op is sre_constants.CATEGORY:
+            contains = contains or av in _NEWLINE_CATEGORIES
+        else:
+            # Unknown set item, assume the worst
+            contains = True
+    return contains != negate
+
+
+def _is_line_local(parsed: sre_parser.SubPattern, flags: int) -> bool:
+    """Check a parsed sequence for constructs that can see past a line.
+
+    Args:
+        parsed: Parsed regex sequence
+        flags: Regex flags in effect for the sequence
+
+    Returns:
+        True if no element can match or look across a newline
+    """
+    for op, av in parsed:
+        if op is sre_constants.LITERAL:
+            if av == 10:
+                return False
+        elif op is sre_constants.NOT_LITERAL:
+            if av != 10:
+                return False
+        elif op is sre_constants.ANY:
+            if flags & re.DOTALL:
+                return False
+        elif op is sre_constants.IN:
+            if _set_has_newline(av):
+                return False
+        elif op is sre_constants.AT:
+            if av not in _LINE_ANCHORS:
+                return False
+        elif op is sre_constants.SUBPATTERN:
+            _group, add_flags, del_flags, sub_pattern = av
+            if not _is_line_local(sub_pattern, (flags | add_flags) & ~del_flags):
+                return False
+        elif op is sre_constants.BRANCH:
+            if not all(_is_line_local(branch, flags) for branch in av[1]):
+                return False
+        elif op in _REPEATS:
+            if not _is_line_local(av[2], flags):
+                return False
+        elif op is sre_constants.ATOMIC_GROUP:
+            if not _is_line_local(av, flags):
+                return False
+        elif op is sre_constants.GROUPREF_EXISTS:
+            _group, yes_branch, no_branch = av
+            if not _is_line_local(yes_branch, flags):
+                return False
+            if no_branch is not None and not _is_line_local(no_branch, flags):
+                return False
+        elif op is not sre_constants.GROUPREF:
+            # Lookarounds and anything unknown may depend on other lines
+            return False
+    return True
+
+
+def is_line_local(regex: re.Pattern) -> bool:
+    """Check whether a regex can be scanned over the whole content per line.
+
+    A line-local regex can neither match nor look across a newline, so
+    searching the whole content with MULTILINE finds exactly the matches a
+    search of each line on its own would find.
+
+    Args:
+        regex: Compiled regex
+
+    Returns:
+        True if the regex is line-local
+    """
+    parsed = parse_regex(regex)
+    return _is_line_local(parsed, parsed.state.flags)
+
+
+# Number of required literals kept per regex, longest first
+MAX_REQUIRED_LITERALS = 3
+
+
+def _collect_required_literals(parsed: sre_parser.SubPattern, flags: int, literals: list) -> None:
+    """Collect literal runs that every match of a parsed sequence contains.
+
+    Args:
+        parsed: Parsed regex sequence
+        flags: Regex flags in effect for the sequence
+        literals: List the literal runs are appended to
+    """
+    run = []
+    for op, av in parsed:
+        if op is sre_constants.LITERAL and not flags & re.IGNORECASE:
+            run.append(chr(av))
+        elif op is sre_constants.AT:
+            # Anchors are zero-width and keep the run contiguous
+            continue
+        elif op is sre_constants.SUBPATTERN:
+            _group, add_flags, del_flags, sub_pattern = av
+            sub_flags = (flags | add_flags) & ~del_flags
+            sub_text, complete = ("", False) if sub_flags & re.IGNORECASE else _literal_run(sub_pattern)
+            if complete:
+                run.append(sub_text)
+            else:
+                literals.append("".join(run))
+                run = []
+                _collect_required_literals(sub_pattern, sub_flags, literals)
+        else:
+            literals.append("".join(run))
+            run = []
+            if op in _REPEATS and av[0] >= 1:
+                _collect_required_literals(av[2], flags, literals)
+    literals.append("".join(run))
+
+
+def _required_literals(parsed: sre_parser.SubPattern) -> list:
+    """Get the longest literals every match of a parsed regex contains.
+
+    Args:
+        parsed: Parsed regex
+
+    Returns:
+        Up to MAX_REQUIRED_LITERALS unique literals, longest first
+    """
+    literals = []
+    _collect_required_literals(parsed, parsed.state.flags, literals)
+    unique_literals = sorted({literal for literal in literals if literal}, key=lambda literal: (-len(literal), literal))
+    return unique_literals[:MAX_REQUIRED_LITERALS]
+
+
+def required_literals(regex: re.Pattern) -> list:
+    """Get the literal substrings every match of a regex must contain.
+
+    Content lacking any of them cannot match, which a str.__contains__
+    check decides much faster than the regex engine.
+
+    Args:
+        regex: Compiled regex
+
+    Returns:
+        Up to MAX_REQUIRED_LITERALS unique literals, longest first
+    """
+    return _required_literals(parse_regex(regex))
+
+
+def _is_anchored(parsed: sre_parser.SubPattern, flags: int, edge: int) -> bool:
+    """Check whether a parsed sequence is anchored at the string start or end.
+
+    Args:
+        parsed: Parsed regex sequence
+        flags: Regex flags in effect for the sequence
+        edge: 0 to check the start, -1 to check the end
+
+    Returns:
+        True if every match touches that edge of the string
+    """
+    if not len(parsed):
+        return False
+    op, av = parsed[edge]
+    if op is sre_constants.AT:
+        string_anchor, line_anchor = (
+            (sre_constants.AT_BEGINNING_STRING, sre_constants.AT_BEGINNING)
+            if edge == 0
+            else (sre_constants.AT_END_STRING, sre_constants.AT_END)
+        )
+        return av is string_anchor or (av is line_anchor and not flags & re.MULTILINE)
+    if op is sre_constants.SUBPATTERN:
+        _group, add_flags, del_flags, sub_pattern = av
+        return _is_anchored(sub_pattern, (flags | add_flags) & ~del_flags, edge)
+    if op is sre_constants.BRANCH:
+        return all(_is_anchored(branch, flags, edge) for branch in av[1])
+    return False
+
+
+def _anchor_class(parsed: sre_parser.SubPattern) -> str:
+    """Classify how a parsed regex is anchored.
+
+    Args:
+        parsed: Parsed regex
+
+    Returns:
+        "start" if it can only match at offset 0, "end" if every match ends
+        at the string end, "multiline" for other MULTILINE regexes and
+        "none" for unanchored regexes
+    """
+    flags = parsed.state.flags
+    if _is_anchored(parsed, flags, 0):
+        return "start"
+    if _is_anchored(parsed, flags, -1):
+        return "end"
+    if flags & re.MULTILINE:
+        return "multiline"
+    return "none"
+
+
+def _has_lookahead(parsed: sre_parser.SubPattern) -> bool:
+    """Check a parsed sequence for lookaheads, which can look past the match.
+
+    Args:
+        parsed: Parsed regex sequence
+
+    Returns:
+        True if a lookahead occurs anywhere in the sequence
+    """
+    for op, av in parsed:
+        if op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            direction, sub_pattern = av
+            if direction == 1 or _has_lookahead(sub_pattern):
+                return True
+        elif op is sre_constants.SUBPATTERN:
+            if _has_lookahead(av[3]):
+                return True
+        elif op is sre_constants.BRANCH:
+            if any(_has_lookahead(branch) for branch in av[1]):
+                return True
+        elif op in _REPEATS:
+            if _has_lookahead(av[2]):
+                return True
+        elif op is sre_constants.ATOMIC_GROUP:
+            if _has_lookahead(av):
+                return True
+        elif op is sre_constants.GROUPREF_EXISTS:
+            _group, yes_branch, no_branch = av
+            if _has_lookahead(yes_branch) or (no_branch is not None and _has_lookahead(no_branch)):
+                return True
+    return False
+
+
+# Fields of the dictionary returned by analyze_regex
+ANALYSIS_FIELDS = ("literal_prefix", "required_literals", "line_local", "anchor", "max_width", "max_reach")
+
+
+def analyze_regex(regex: re.Pattern) -> dict:
+    """Run every analysis on a regex with a single parse.
+
+    Args:
+        regex: Compiled regex
+
+    Returns:
+        Dictionary with "literal_prefix", "required_literals", "line_local",
+        "anchor" (see _anchor_class), "max_width" (longest possible
+        match, None if unbounded) and "max_reach" (characters past its
+        start a match attempt can examine, None if unbounded) fields
+    """
+    parsed = parse_regex(regex)
+    prefix = "" if regex.flags & re.IGNORECASE else _literal_run(parsed)[0]
+    max_width = parsed.getwidth()[1]
+    if max_width >= sre_constants.MAXREPEAT:
+        max_width = None
+    # One more character than the match: anchors such as \b and $ look at the next one
+    max_reach = None if max_width is None or _has_lookahead(parsed) else max_width + 1
+    return {
+        "literal_prefix": prefix,
+        "required_literals": _required_literals(parsed),
+        "line_local": _is_line_local(parsed, parsed.state.flags),
+        "anchor": _anchor_class(parsed),
+        "max_width": max_width,
+        "max_reach": max_reach,
+    }
+
+
+def literal_prefix(regex: re.Pattern) -> str:
+    """Get the literal text every match of a regex starts with.
+
+    Args:
+        regex: Compiled regex
+
+    Returns:
+        Required literal prefix, or "" if the regex does not start with one
+    """
+    if regex.flags & re.IGNORECASE:
+        return ""
+    prefix, _complete = _literal_run(parse_regex(regex))
+    return prefix
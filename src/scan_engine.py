@@ -0,0 +1,268 @@
+"""Single-pass multi-pattern scanning.
+
+Regexes that start with a literal prefix are not searched one by one.
+Their prefixes are merged into a trie, and the trie is compiled into a
+single regex (the literal automaton) that finds every position where any
+prefix occurs in one walk over the content. Only at those positions is the
+full regex tried, anchored with match(). Regexes without a literal prefix
+fall back to an individual search. The automaton is built once per scan;
+prefixes that have resolved are skipped at later positions, and it is only
+rebuilt when few prefixes are left. Content shorter than
+AUTOMATON_MIN_LENGTH is searched per regex, which is cheaper than building
+the automaton.
+
+Regexes anchored at the string start are only tried at offset 0, and
+regexes anchored at the end only over the tail window a match can start in.
+
+Required literals act as a prefilter: a regex whose required literals are
+not all in the content is rejected with str.__contains__ before the regex
+engine runs. For regexes in the automaton, the literals beyond the prefix
+are checked once, when the prefix is first found.
+"""
+
+import re
+from collections.abc import Iterator
+from functools import lru_cache
+from itertools import takewhile
+
+# Positions where a prefix occurs but its regexes fail to match, tolerated
+# before those regexes are handed over to an individual search
+MAX_FAILED_CANDIDATES = 16
+
+# Content length (characters) below which each regex is searched on its own:
+# compiling the automaton costs more than searching short content per regex
+AUTOMATON_MIN_LENGTH = 1 << 16
+
+# The automaton is rebuilt once the unresolved prefixes have shrunk to this
+# fraction of those it was built from, so the rebuilds cost at most a third
+# of the first build in total
+REBUILD_SHRINK_FACTOR = 4
+
+
+def build_literal_trie(literals: list) -> dict:
+    """Build a character trie of literals.
+
+    Args:
+        literals: List of non-empty literal strings
+
+    Returns:
+        Nested dictionary keyed by character; the "" key of a node holds
+        the literal that ends there
+    """
+    trie = {}
+    for literal in literals:
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node[""] = literal
+    return trie
+
+
+def trie_to_regex(node: dict) -> str:
+    """Convert a literal trie into an equivalent regex source.
+
+    Args:
+        node: Trie node from build_literal_trie
+
+    Returns:
+        Regex source that matches any literal of the trie
+    """
+    branches = [re.escape(char) + trie_to_regex(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+    return f"(?:{body})?" if "" in node else body
+
+
+@lru_cache(maxsize=64)
+def compile_literal_automaton(prefixes: tuple) -> tuple[dict, re.Pattern]:
+    """Build the literal automaton of a set of prefixes.
+
+    Cached, so a resident process (the daemon) scanning with the same
+    patterns again does not rebuild it.
+
+    Args:
+        prefixes: Tuple of non-empty literal prefixes
+
+    Returns:
+        Tuple of (trie from build_literal_trie, compiled regex matching any prefix)
+    """
+    trie = build_literal_trie(prefixes)
+    return trie, re.compile(trie_to_regex(trie))
+
+
+def literals_at(trie: dict, content: str, pos: int) -> list:
+    """Get the literals of a trie that occur at a position.
+
+    Args:
+        trie: Trie from build_literal_trie
+        content: Text to look into
+        pos: Position to look at
+
+    Returns:
+        List of literals that content has at pos
+    """
+    found = []
+    node = trie
+    for index in range(pos, len(content)):
+        node = node.get(content[index])
+        if node is None:
+            break
+        if "" in node:
+            found.append(node[""])
+    return found
+
+
+def has_literals(content: str, literals: list) -> bool:
+    """Check that content contains every literal.
+
+    Args:
+        content: Text to look into
+        literals: List of literal strings
+
+    Returns:
+        True if all literals occur in content
+    """
+    return all(literal in content for literal in literals)
+
+
+def tail_window_start(content: str, analysis: dict) -> int:
+    """Get the first offset a match of an end-anchored regex can start at.
+
+    Args:
+        content: Text to search
+        analysis: Regex analysis from regex_analysis.analyze_regex
+
+    Returns:
+        Offset to start searching at (0 if the window is unbounded)
+    """
+    max_width = analysis["max_width"]
+    if max_width is not None:
+        # One extra character: $ also matches before a trailing newline
+        return max(0, len(content) - max_width - 1)
+    if analysis["line_local"]:
+        # The match lies within the last line
+        return content.rfind("\n", 0, len(content) - 1) + 1
+    return 0
+
+
+def anchored_search(regex: re.Pattern, content: str, analysis: dict) -> re.Match | None:
+    """Search content with the cheapest strategy for the regex's anchoring.
+
+    Args:
+        regex: Compiled regex
+        content: Text to search
+        analysis: Regex analysis from regex_analysis.analyze_regex
+
+    Returns:
+        First match, or None; the same result as regex.search(content)
+    """
+    anchor = analysis["anchor"]
+    if anchor == "start":
+        return regex.match(content)
+    if anchor == "end":
+        return regex.search(content, tail_window_start(content, analysis))
+    return regex.search(content)
+
+
+def anchored_finditer(regex: re.Pattern, content: str, analysis: dict) -> Iterator[re.Match]:
+    """Find all matches with the cheapest strategy for the regex's anchoring.
+
+    Args:
+        regex: Compiled regex
+        content: Text to search
+        analysis: Regex analysis from regex_analysis.analyze_regex
+
+    Returns:
+        Lazy iterator over the same matches as regex.finditer(content)
+    """
+    anchor = analysis["anchor"]
+    if anchor == "start":
+        match = regex.match(content)
+        if match is None:
+            return iter([])
+        if match.end() > 0:
+            return iter([match])
+        # After an empty match, finditer also tries a non-empty one at the same offset
+        return takewhile(lambda match: match.start() == 0, regex.finditer(content))
+    if anchor == "end":
+        return regex.finditer(content, tail_window_start(content, analysis))
+    return regex.finditer(content)
+
+
+def scan_matched_indices(content: str, regexes: list, analyses: list) -> set:
+    """Find which regexes match anywhere in content.
+
+    Args:
+        content: Clipboard text content
+        regexes: List of compiled regexes
+        analyses: Analysis of each regex from regex_analysis.analyze_regex
+
+    Returns:
+        Set of indices of the regexes that match
+    """
+    if len(content) < AUTOMATON_MIN_LENGTH:
+        return {
+            index
+            for index, (regex, analysis) in enumerate(zip(regexes, analyses))
+            if has_literals(content, analysis["required_literals"]) and anchored_search(regex, content, analysis)
+        }
+
+    literals = [analysis["required_literals"] for analysis in analyses]
+    matched = set()
+    by_prefix = {}
+    unchecked = set()
+
+    for index, (regex, analysis) in enumerate(zip(regexes, analyses)):
+        prefix = analysis["literal_prefix"]
+        if prefix and analysis["anchor"] != "end":
+            by_prefix.setdefault(prefix, []).append(index)
+            if any(literal not in prefix for literal in literals[index]):
+                unchecked.add(index)
+        elif has_literals(content, literals[index]) and anchored_search(regex, content, analysis):
+            matched.add(index)
+
+    failures = dict.fromkeys(by_prefix, 0)
+    compiled = tuple(by_prefix)
+    trie, automaton = compile_literal_automaton(compiled)
+    pos = 0
+    while by_prefix:
+        hit = automaton.search(content, pos)
+        if hit is None:
+            break
+        start = hit.start()
+
+        for prefix in literals_at(trie, content, start):
+            if prefix not in by_prefix:
+                # Resolved at an earlier position
+                continue
+            remaining = []
+            for index in by_prefix[prefix]:
+                if index in unchecked:
+                    unchecked.discard(index)
+                    if not has_literals(content, literals[index]):
+                        continue
+                if regexes[index].match(content, start):
+                    matched.add(index)
+                else:
+                    remaining.append(index)
+
+            if remaining:
+                failures[prefix] += 1
+                if failures[prefix] > MAX_FAILED_CANDIDATES:
+                    # Too many false candidates: a plain search is cheaper
+                    matched.update(index for index in remaining if regexes[index].search(content, start))
+                    remaining = []
+
+            if remaining:
+                by_prefix[prefix] = remaining
+            else:
+                del by_prefix[prefix]
+
+        if by_prefix and len(by_prefix) * REBUILD_SHRINK_FACTOR <= len(compiled):
+            # Most prefixes are resolved: stop stepping through their occurrences
+            compiled = tuple(by_prefix)
+            trie, automaton = compile_literal_automaton(compiled)
+        pos = start + 1
+
+    return matched
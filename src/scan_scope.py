@@ -0,0 +1,196 @@
+"""Per-pattern scan scope, content-size gates and the scan window."""
+
+# Scope that examines the whole content
+SCOPE_ALL = ("all", 0)
+
+# Characters encoded at a time when measuring the UTF-8 size
+SIZE_CHUNK = 1 << 20
+
+# Clipboards can hold lone surrogates (e.g. on Windows); they are measured as
+# the three bytes surrogatepass encodes them to, as match_cache.content_digest does
+ENCODE_ERRORS = "surrogatepass"
+
+
+def parse_scope(scope: str) -> tuple[str, int]:
+    """Parse the scope field of a pattern.
+
+    Args:
+        scope: "all", "first_line", "head:N" or "tail:N" (N lines)
+
+    Returns:
+        Tuple of ("all" | "head" | "tail", number of lines)
+
+    Raises:
+        ValueError: If the scope is not recognised
+    """
+    if scope == "all":
+        return SCOPE_ALL
+    if scope == "first_line":
+        return ("head", 1)
+
+    kind, _, lines = scope.partition(":")
+    if kind in ("head", "tail") and lines.isdigit() and int(lines) > 0:
+        return (kind, int(lines))
+    raise ValueError(f"invalid scope {scope!r} (all, first_line, head:N, tail:N)")
+
+
+def scope_slice(content: str, scope: tuple[str, int]) -> str:
+    """Get the part of content a scope examines.
+
+    Args:
+        content: Clipboard text content
+        scope: Parsed scope from parse_scope
+
+    Returns:
+        The first or last N lines of content, or all of it
+    """
+    kind, lines = scope
+    if kind == "head":
+        end = -1
+        for _ in range(lines):
+            end = content.find("\n", end + 1)
+            if end == -1:
+                return content
+        return content[:end]
+
+    if kind == "tail":
+        # A trailing newline does not start another line
+        start = len(content) - 1 if content.endswith("\n") else len(content)
+        for _ in range(lines):
+            start = content.rfind("\n", 0, start)
+            if start == -1:
+                return content
+        return content[start + 1 :]
+
+    return content
+
+
+class ContentSize:
+    """UTF-8 size of content, computed exactly only when a gate needs it.
+
+    A str of n characters encodes to between n and 4n bytes, and ASCII
+    content to exactly n bytes, which settles most gates without encoding.
+    """
+
+    __slots__ = ("content", "_exact")
+
+    def __init__(self, content: str) -> None:
+        self.content = content
+        self._exact = len(content) if content.isascii() else None
+
+    def exact(self) -> int:
+        """Get the exact UTF-8 size in bytes."""
+        if self._exact is None:
+            # Encode in chunks so large content is never copied whole
+            content = self.content
+            self._exact = sum(
+                len(content[start : start + SIZE_CHUNK].encode("utf-8", ENCODE_ERRORS))
+                for start in range(0, len(content), SIZE_CHUNK)
+            )
+        return self._exact
+
+    def passes(self, min_bytes: int | None, max_bytes: int | None) -> bool:
+        """Check whether the size lies within the gate.
+
+        Args:
+            min_bytes: Minimum size in bytes (no lower bound if None)
+            max_bytes: Maximum size in bytes (no upper bound if None)
+
+        Returns:
+            True if min_bytes <= size <= max_bytes
+        """
+        low = high = self._exact
+        if low is None:
+            low, high = len(self.content), 4 * len(self.content)
+
+        if min_bytes is not None and high < min_bytes:
+            return False
+        if max_bytes is not None and low > max_bytes:
+            return False
+        if (min_bytes is None or low >= min_bytes) and (max_bytes is None or high <= max_bytes):
+            return True
+        return (min_bytes is None or self.exact() >= min_bytes) and (max_bytes is None or self.exact() <= max_bytes)
+
+
+def utf8_prefix(content: str, max_bytes: int) -> str:
+    """Get the longest prefix of content that fits in max_bytes of UTF-8.
+
+    Args:
+        content: Text content
+        max_bytes: Size limit in bytes
+
+    Returns:
+        Prefix of content whose UTF-8 encoding is at most max_bytes
+    """
+    head = content[:max_bytes]
+    if head.isascii():
+        return head
+    encoded = head.encode("utf-8", ENCODE_ERRORS)
+    end = min(max_bytes, len(encoded))
+    # Back off to the start of a character cut in half
+    while end < len(encoded) and encoded[end] & 0xC0 == 0x80:
+        end -= 1
+    return encoded[:end].decode("utf-8", ENCODE_ERRORS)
+
+
+def utf8_suffix(content: str, max_bytes: int) -> str:
+    """Get the longest suffix of content that fits in max_bytes of UTF-8.
+
+    Args:
+        content: Text content
+        max_bytes: Size limit in bytes
+
+    Returns:
+        Suffix of content whose UTF-8 encoding is at most max_bytes
+    """
+    if max_bytes <= 0:
+        return ""
+    tail = content[-max_bytes:]
+    if tail.isascii():
+        return tail
+    encoded = tail.encode("utf-8", ENCODE_ERRORS)
+    start = max(0, len(encoded) - max_bytes)
+    # Skip the rest of a character cut in half
+    while start < len(encoded) and encoded[start] & 0xC0 == 0x80:
+        start += 1
+    return encoded[start:].decode("utf-8", ENCODE_ERRORS)
+
+
+def get_scan_window(content: str, max_scan_bytes: int | None, mode: str = "head") -> tuple[str, bool]:
+    """Get the part of the clipboard that matching and preview operate on.
+
+    Args:
+        content: Clipboard text content
+        max_scan_bytes: Size limit in bytes (no limit if None)
+        mode: "head" for the first max_scan_bytes, or "head_tail" for the
+            first and last half joined by a newline
+
+    Returns:
+        Tuple of (window content, whether content was truncated)
+    """
+    if max_scan_bytes is None or ContentSize(content).passes(None, max_scan_bytes):
+        return content, False
+
+    if mode == "head_tail":
+        half = max_scan_bytes // 2
+        return f"{utf8_prefix(content, half)}\n{utf8_suffix(content, max_scan_bytes - half - 1)}", True
+    return utf8_prefix(content, max_scan_bytes), True
+
+
+def get_tail_line_offset(content: str, window: str, max_scan_bytes: int) -> tuple[int, int]:
+    """Get how lines of a truncated head_tail window map to lines of content.
+
+    Args:
+        content: Clipboard text content
+        window: Window from get_scan_window(content, max_scan_bytes, "head_tail")
+        max_scan_bytes: Size limit the window was taken with
+
+    Returns:
+        Tuple of (first line of the window (0-based) that comes from the
+        tail, number of lines to add to it and later lines for the line
+        numbers of content)
+    """
+    head_length = len(utf8_prefix(content, max_scan_bytes // 2))
+    tail_start = len(content) - (len(window) - head_length - 1)
+    # The head and the tail each end or start in the middle of a line
+    return window.count("\n", 0, head_length) + 1, content.count("\n", head_length, tail_start) - 1
@@ -0,0 +1,102 @@
+"""Startup phases of a launch, overlapped on threads and timed.
+
+A launch reads the clipboard, loads the config and matches. Reading the
+clipboard mostly waits on a helper process (xclip, xsel, wl-paste),
+outside the GIL, so it runs on a background thread while the config is
+loaded.
+
+Background phases only hand back results or errors, which the main thread
+reports when it takes the result, so messages come out in the same order
+as in a sequential launch (only a missing pyperclip is reported as soon as
+the clipboard thread finds it).
+"""
+
+import threading
+import time
+
+from .menu import GRAY, RESET
+
+# Phase names in the order they are reported, with their labels
+PHASE_LABELS = {
+    "clipboard": "クリップボード",
+    "config": "設定",
+    "match": "マッチング",
+}
+
+
+def run_phase(timings: dict, name: str, func, *args):
+    """Run a phase on the current thread, timing it.
+
+    Args:
+        timings: Dictionary the elapsed seconds are stored in, by phase name
+        name: Phase name
+        func: Function running the phase
+        *args: Arguments of func
+
+    Returns:
+        Return value of func
+    """
+    start = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        timings[name] = time.perf_counter() - start
+
+
+class BackgroundPhase:
+    """A phase running on a background thread, timed.
+
+    The thread is a daemon thread, so a launch that exits early does not
+    wait for it.
+    """
+
+    __slots__ = ("_thread", "_result", "_error")
+
+    def __init__(self, timings: dict, name: str, func, *args) -> None:
+        """Start a phase.
+
+        Args:
+            timings: Dictionary the elapsed seconds are stored in, by phase name
+            name: Phase name
+            func: Function running the phase
+            *args: Arguments of func
+        """
+        self._result = None
+        self._error = None
+        self._thread = threading.Thread(target=self._run, args=(timings, name, func, args), daemon=True)
+        self._thread.start()
+
+    def _run(self, timings: dict, name: str, func, args: tuple) -> None:
+        try:
+            self._result = run_phase(timings, name, func, *args)
+        except BaseException as e:
+            # SystemExit included: raised again on the main thread by result()
+            self._error = e
+
+    def result(self):
+        """Wait for the phase to finish.
+
+        Returns:
+            Return value of the phase function
+
+        Raises:
+            BaseException: Whatever the phase function raised
+        """
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+def print_timings(timings: dict, total: float) -> None:
+    """Print the time taken by each phase and by the whole startup.
+
+    Args:
+        timings: Elapsed seconds by phase name
+        total: Elapsed seconds from start until the menu was ready
+    """
+    phases = " / ".join(
+        f"{label} {timings[name] * 1000:.1f}" for name, label in PHASE_LABELS.items() if name in timings
+    )
+    sequential = sum(timings.values())
+    print(f"{GRAY}起動時間 (ms): {phases} | 合計 {total * 1000:.1f} (逐次実行なら {sequential * 1000:.1f}){RESET}")
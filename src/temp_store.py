@@ -0,0 +1,176 @@
+"""Content-addressed store of clipboard temp files.
+
+With clipboard_temp_dir set, each clipboard content is saved in that
+directory as <digest>.txt instead of the single clipboard_temp_file, so
+launches running side by side, and commands still running from earlier
+launches, never see the file they read change or appear half-written:
+
+- A new entry is written under a name private to the writer and renamed
+  into place, so an entry is either absent or complete.
+- Content already in the store is reused without rewriting; the entry is
+  touched so it counts as recently used.
+- After each save, a background thread removes entries older than the age
+  budget, then the least recently used ones until the store fits the size
+  budget. The entry just saved is always kept.
+"""
+
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+from .clipboard import write_content
+
+# Suffix of the entries; writers' private files start with a dot and end in .tmp
+ENTRY_SUFFIX = ".txt"
+PARTIAL_SUFFIX = ".tmp"
+
+# Seconds after which a private file left by a crashed writer is removed
+PARTIAL_MAX_AGE = 3600
+
+
+def get_entry_path(store_dir: Path, digest: str) -> Path:
+    """Get the path of the entry of a content.
+
+    Args:
+        store_dir: Store directory
+        digest: Digest of the content from match_cache.content_digest
+
+    Returns:
+        Path of the entry
+    """
+    return store_dir / f"{digest}{ENTRY_SUFFIX}"
+
+
+def get_encoded_size(content: str) -> int:
+    """Get the size of content as written by clipboard.write_content.
+
+    Args:
+        content: Text content
+
+    Returns:
+        Size in bytes
+    """
+    size = len(content) if content.isascii() else len(content.encode("utf-8"))
+    return size + content.count("\n") * (len(os.linesep) - 1)
+
+
+def store_content(content: str, store_dir: Path, digest: str | None = None) -> Path:
+    """Save content in the store, reusing its entry if already there.
+
+    An entry whose size does not match (e.g. edited by a command) is
+    replaced.
+
+    Args:
+        content: Text content to save
+        store_dir: Store directory
+        digest: Digest of content from match_cache.content_digest, if
+            already computed
+
+    Returns:
+        Path of the entry
+
+    Raises:
+        OSError: If the entry cannot be written
+    """
+    from .match_cache import content_digest
+
+    entry_path = get_entry_path(store_dir, digest or content_digest(content))
+    size = get_encoded_size(content)
+    try:
+        if entry_path.stat().st_size == size:
+            os.utime(entry_path)
+            return entry_path
+    except OSError:
+        pass
+
+    store_dir.mkdir(parents=True, exist_ok=True)
+    partial_path = store_dir / f".{entry_path.stem}.{os.getpid()}.{threading.get_ident()}{PARTIAL_SUFFIX}"
+    try:
+        with open(partial_path, "wb") as f:
+            write_content(f, content)
+        os.replace(partial_path, entry_path)
+    except OSError:
+        partial_path.unlink(missing_ok=True)
+        # On Windows an entry open in another process cannot be replaced; it is as good if complete
+        if entry_path.is_file() and entry_path.stat().st_size == size:
+            return entry_path
+        raise
+    return entry_path
+
+
+def clean_store(store_dir: Path, max_bytes: int, max_age: float, keep: Path | None = None) -> None:
+    """Remove entries beyond the age and size budgets.
+
+    Args:
+        store_dir: Store directory
+        max_bytes: Total size entries are cut down to
+        max_age: Seconds since last use after which an entry is removed
+        keep: Entry that is never removed, or None
+    """
+    now = time.time()
+    entries = []
+    try:
+        with os.scandir(store_dir) as it:
+            for entry in it:
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                if entry.name.endswith(PARTIAL_SUFFIX):
+                    if now - stat.st_mtime > PARTIAL_MAX_AGE:
+                        Path(entry.path).unlink(missing_ok=True)
+                elif entry.name.endswith(ENTRY_SUFFIX) and Path(entry.path) != keep:
+                    entries.append((stat.st_mtime, stat.st_size, Path(entry.path)))
+    except OSError:
+        return
+
+    total = sum(size for _mtime, size, _path in entries)
+    if keep is not None:
+        try:
+            total += keep.stat().st_size
+        except OSError:
+            pass
+
+    # Oldest first
+    entries.sort()
+    for mtime, size, path in entries:
+        if now - mtime <= max_age and total <= max_bytes:
+            break
+        try:
+            path.unlink(missing_ok=True)
+        except OSError:
+            # e.g. still open by a command on Windows; retried after the next save
+            continue
+        total -= size
+
+
+def save_to_store(content: str, store: dict, digest: str | None = None) -> Path:
+    """Save clipboard content in the store and clean it up in the background.
+
+    Args:
+        content: Text content to save
+        store: Store settings from the menu ("dir", "max_bytes", "max_age")
+        digest: Digest of content from match_cache.content_digest, if
+            already computed
+
+    Returns:
+        Path of the entry
+
+    Raises:
+        SystemExit: If the entry cannot be written
+    """
+    store_dir = Path(store["dir"])
+    try:
+        entry_path = store_content(content, store_dir, digest)
+    except Exception as e:
+        print(f"エラー: クリップボード内容の保存に失敗しました: {e}")
+        sys.exit(1)
+
+    threading.Thread(
+        target=clean_store,
+        args=(store_dir, store["max_bytes"], store["max_age"], entry_path),
+        daemon=True,
+    ).start()
+    return entry_path
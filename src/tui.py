@@ -1,93 +1,101 @@
 """TUI (Text User Interface) display operations."""
 
-import re
+from .line_index import LineIndex
+from .line_renderer import PREVIEW_WIDTH, render_line, visible_end, visible_slice
+from .menu import COLOR_BRIGHT_RED, COLOR_RESET, GRAY, RESET, print_choices, print_no_match, print_preview
+from .pattern_matcher import MatchSpans, get_display_lines
 
-from .pattern_matcher import colorize_matched_text, get_display_lines
 
-# ANSI color codes
-COLOR_RESET = "\033[0m"
-COLOR_WHITE = "\033[97m"  # Bright white for headers and prompts
-COLOR_BRIGHT_RED = "\033[91m"  # Bright red for pattern options
-GRAY = "\033[90m"
-RESET = "\033[0m"
-
-
-def display_tui(content: str, matched_patterns: list) -> None:
-    """Display TUI with clipboard content and matched patterns.
+def render_preview(content: str, matched_patterns: list, spans: MatchSpans | None = None) -> list:
+    """Render the preview lines of the clipboard content.
 
     Args:
         content: Clipboard text content
-        matched_patterns: List of matched pattern dictionaries
-    """
-    # Display clipboard content (matched lines with context)
-    print(f"{GRAY}クリップボード内容:{RESET}")
-    print(f"{GRAY}{'-' * 40}{RESET}")
+        matched_patterns: List of matched Patterns
+        spans: Match spans of matched_patterns over content (built if not given)
 
-    display_lines = get_display_lines(content, matched_patterns)
+    Returns:
+        List of printable lines (matched lines with context, highlighted)
+    """
+    if spans is None:
+        spans = MatchSpans(LineIndex(content), matched_patterns)
+    # Only the part of each line that can be shown is extracted
+    display_lines = get_display_lines(content, matched_patterns, spans=spans, max_length=PREVIEW_WIDTH + 1)
 
+    preview = []
     for line_content, line_num in display_lines:
         # Special markers don't get colorized
         if line_num == -1:
-            print(f"{GRAY}{line_content}{RESET}")
+            preview.append(f"{GRAY}{line_content}{RESET}")
         else:
-            # Colorize the line before truncating
-            colorized_line = colorize_matched_text(line_content, matched_patterns)
-
-            # Handle truncation - need to be careful with ANSI codes
-            # Calculate visible length (excluding ANSI codes)
-            visible_length = len(re.sub(r"\033\[[0-9;]+m", "", colorized_line))
+            line_content = visible_slice(spans.index, line_num, line_content)
+            # Only the visible prefix of the line is highlighted
+            line_spans = spans.line_spans(line_num, visible_end(line_content))
+            preview.append(render_line(line_content, line_spans))
+    return preview
 
-            if visible_length > 80:
-                # Truncate to 80 visible characters
-                # This is complex with ANSI codes, so we'll truncate the original and re-colorize
-                truncated_line = line_content[:80]
-                colorized_line = colorize_matched_text(truncated_line, matched_patterns)
-                print(colorized_line + "...")
-            else:
-                print(colorized_line)
 
-    print(f"{GRAY}{'-' * 40}{RESET}")
-    print()
+def render_no_match_preview(content: str) -> list:
+    """Render the preview lines shown when no pattern matches.
 
-    # Display matched patterns
-    print(f"{GRAY}マッチしたパターン:{RESET}")
-    for i, pattern in enumerate(matched_patterns):
-        letter = chr(ord("a") + i)
-        name = pattern.get("name", "unknown")
-        print(f"{COLOR_BRIGHT_RED}{letter}: {name}{COLOR_RESET}")
+    Args:
+        content: Clipboard text content
 
-    print()
+    Returns:
+        List of printable lines (the first three lines of content)
+    """
+    # Only the part of the lines shown that can be shown is extracted
+    index = LineIndex(content)
+    return [
+        render_line(visible_slice(index, i, index.line(i, PREVIEW_WIDTH + 1)), [])
+        for i in range(min(3, index.line_count))
+    ]
+
+
+def display_tui(
+    content: str,
+    matched_patterns: list,
+    truncated: bool = False,
+    spans: MatchSpans | None = None,
+    preview: list | None = None,
+) -> None:
+    """Display TUI with clipboard content and matched patterns.
 
-    # Show prompt
-    last_letter = chr(ord("a") + len(matched_patterns) - 1)
-    print(f"{COLOR_WHITE}選択してください (a-{last_letter}, ESC: 終了): {COLOR_RESET}", end="", flush=True)
+    Args:
+        content: Clipboard text content
+        matched_patterns: List of matched Patterns
+        truncated: Whether content is a truncated scan window
+        spans: Match spans of matched_patterns over content (built if not given)
+        preview: Preview lines from render_preview (rendered if not given)
+    """
+    if preview is None:
+        preview = render_preview(content, matched_patterns, spans)
+    print_preview(preview, truncated)
+    print_choices([pattern.name for pattern in matched_patterns])
 
 
-def display_no_match_tui(content: str) -> None:
+def display_no_match_tui(content: str, truncated: bool = False) -> None:
     """Display TUI when no patterns match.
 
     Args:
         content: Clipboard text content
+        truncated: Whether content is a truncated scan window
     """
-    # Display clipboard content (first 3 lines)
-    print(f"{GRAY}クリップボード内容:{RESET}")
-    print(f"{GRAY}{'-' * 40}{RESET}")
-
-    lines = content.split("\n")
-    for i in range(min(3, len(lines))):
-        line = lines[i]
-        # Truncate if too long
-        if len(line) > 80:
-            print(line[:80] + "...")
-        else:
-            print(line)
+    print_preview(render_no_match_preview(content), truncated)
+    print_no_match()
 
-    print(f"{GRAY}{'-' * 40}{RESET}")
-    print()
 
-    # Display no match message
-    print(f"{GRAY}マッチする候補がありませんでした{RESET}")
-    print()
+def display_prefilter_debug(patterns: list) -> None:
+    """Display the literal prefilter each pattern was reduced to.
 
-    # Show prompt
-    print(f"{COLOR_WHITE}任意のキーを押して終了: {COLOR_RESET}", end="", flush=True)
+    Args:
+        patterns: List of compiled Patterns
+    """
+    print(f"{GRAY}パターンのリテラル事前判定:{RESET}")
+    for pattern in patterns:
+        literals = ", ".join(repr(literal) for literal in pattern.required_literals) or "(なし: 正規表現で評価)"
+        prefix = repr(pattern.literal_prefix) if pattern.literal_prefix else "(なし)"
+        print(f"{COLOR_BRIGHT_RED}{pattern.name}{COLOR_RESET} {GRAY}/{pattern.regex}/{RESET}")
+        print(f"  必須リテラル: {literals}")
+        print(f"  先頭リテラル: {prefix}")
+        print(f"  アンカー: {pattern.anchor}")
@@ -0,0 +1,87 @@
+"""Clipboard watcher that lets the daemon prepare menus before the hotkey.
+
+The clipboard is polled through the clipboard backend in use. Polls start
+every POLL_MIN_INTERVAL seconds after a change and back off to
+POLL_MAX_INTERVAL while the clipboard stays the same, since with pyperclip
+on Linux each poll runs a clipboard helper process. A change is debounced: it is only
+acted on once the same content has been read on STABLE_POLLS consecutive
+polls, so applications that set the clipboard several times in a row
+cause one preparation, not several.
+
+Only the digest of the last content is kept between polls, so the watcher
+does not hold a copy of the clipboard, and nothing is written to disk
+until a launch runs a command that needs it.
+"""
+
+import threading
+
+from .clipboard import paste_clipboard
+from .match_cache import content_digest
+
+# Poll interval right after a change, and the interval it backs off to
+POLL_MIN_INTERVAL = 0.25
+POLL_MAX_INTERVAL = 2.0
+POLL_BACKOFF = 1.5
+
+# Consecutive polls that must read the same content before it is acted on
+STABLE_POLLS = 2
+
+
+def read_clipboard() -> str | None:
+    """Read the clipboard for the watcher, without the launcher's error handling.
+
+    Returns:
+        Clipboard text, or None if it is empty or cannot be read
+    """
+    try:
+        return paste_clipboard() or None
+    except Exception:
+        return None
+
+
+def next_poll_interval(interval: float, changed: bool) -> float:
+    """Get the interval until the next poll.
+
+    Args:
+        interval: Current poll interval in seconds
+        changed: Whether the last poll saw unsettled or new content
+
+    Returns:
+        POLL_MIN_INTERVAL after a change, otherwise the backed-off interval
+    """
+    if changed:
+        return POLL_MIN_INTERVAL
+    return min(interval * POLL_BACKOFF, POLL_MAX_INTERVAL)
+
+
+def watch_clipboard(on_change, stop: threading.Event, read=read_clipboard) -> None:
+    """Poll the clipboard until stopped, reporting each settled change.
+
+    Args:
+        on_change: Called with (content, digest) once new content has settled
+        stop: Event that ends the watch
+        read: Function returning the clipboard text, or None
+    """
+    handled_digest = None
+    pending_digest = None
+    stable_polls = 0
+    interval = POLL_MIN_INTERVAL
+
+    while not stop.wait(interval):
+        content = read()
+        digest = content_digest(content) if content else None
+        if digest == handled_digest:
+            pending_digest = None
+            interval = next_poll_interval(interval, changed=False)
+            continue
+
+        if digest != pending_digest:
+            pending_digest = digest
+            stable_polls = 0
+        stable_polls += 1
+        interval = next_poll_interval(interval, changed=True)
+        if stable_polls >= STABLE_POLLS:
+            handled_digest = digest
+            pending_digest = None
+            if content:
+                on_change(content, digest)